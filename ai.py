@@ -0,0 +1,195 @@
+import math
+import random
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Hashable
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+
+from simulator import Arena
+from simulator import Outcome
+from simulator import Shot
+from simulator import simulate_shot
+
+
+class Difficulty(Enum):
+    EASY = 1
+    MEDIUM = 2
+    HARD = 3
+
+
+class SearchSettings(NamedTuple):
+    angles: int
+    powers: int
+    refinements: int
+    angle_error: float
+    power_error: float
+
+
+SETTINGS = {
+    Difficulty.EASY: SearchSettings(6, 4, 1, 0.12, 12),
+    Difficulty.MEDIUM: SearchSettings(8, 5, 3, 0.04, 4),
+    Difficulty.HARD: SearchSettings(10, 6, 6, 0, 0),
+}
+
+
+class Candidate(NamedTuple):
+    score: float
+    angle: float
+    power: float
+
+
+class ComputerPlayer:
+    """
+    Stands in for a gorilla, choosing angle and power by searching simulated throws
+    from coarse to fine.
+    The search runs a slice at a time from update, so it never stalls a frame, and
+    gives up with its best shot so far once the per-turn budget is spent.
+    Evaluated shots are remembered for as long as the wind and skyline stay the same.
+    """
+
+    def __init__(
+        self,
+        difficulty: Difficulty = Difficulty.MEDIUM,
+        turn_budget: float = 0.05,
+        frame_budget: float = 0.004,
+        min_power: float = 10,
+        max_power: float = 200,
+    ) -> None:
+        self.difficulty = difficulty
+        self.turn_budget = turn_budget
+        self.frame_budget = frame_budget
+        self.min_power = min_power
+        self.max_power = max_power
+        self.memo: OrderedDict[Hashable, dict[tuple[float, float], float]] = (
+            OrderedDict()
+        )
+        self.max_memo_states = 8
+        self.best: Optional[Candidate] = None
+        self.elapsed = 0.0
+        self._search: Optional[Iterator[None]] = None
+
+    @property
+    def settings(self) -> SearchSettings:
+        return SETTINGS[self.difficulty]
+
+    @property
+    def thinking(self) -> bool:
+        return self._search is not None
+
+    def plan(self, world) -> None:
+        """
+        Start searching for a shot for the world's current player
+        """
+
+        player = world.current_player
+        arena = Arena.from_world(world)
+        key = (
+            world.wind.speed,
+            world.wind.direction,
+            world.skyline.version,
+            player,
+        )
+        memo = self.memo.pop(key, None)
+        if memo is None:
+            memo = {}
+        self.memo[key] = memo
+        while len(self.memo) > self.max_memo_states:
+            self.memo.popitem(last=False)
+
+        self.best = None
+        self.elapsed = 0.0
+        self._search = self._coarse_to_fine(arena, player, memo)
+
+    def update(self) -> Optional[tuple[float, float]]:
+        """
+        Search for up to the frame budget. Returns the chosen angle and power once
+        the search is finished or the turn budget is spent, otherwise None.
+        """
+
+        if self._search is None:
+            return None
+
+        start = time.perf_counter()
+        budget = min(self.frame_budget, self.turn_budget - self.elapsed)
+        finished = False
+        while time.perf_counter() - start < budget:
+            try:
+                next(self._search)
+            except StopIteration:
+                finished = True
+                break
+        self.elapsed += time.perf_counter() - start
+
+        if not finished and self.elapsed < self.turn_budget:
+            return None
+
+        self._search = None
+        return self._aim()
+
+    def _aim(self) -> tuple[float, float]:
+        settings = self.settings
+        best = self.best or Candidate(math.inf, math.pi / 4, self.max_power / 2)
+        angle = best.angle + random.uniform(-1, 1) * settings.angle_error
+        power = best.power + random.uniform(-1, 1) * settings.power_error
+        return angle, min(max(power, self.min_power), self.max_power)
+
+    def _coarse_to_fine(
+        self, arena: Arena, player: int, memo: dict[tuple[float, float], float]
+    ) -> Iterator[None]:
+        settings = self.settings
+        angle_step = math.pi / (settings.angles + 1)
+        power_step = (self.max_power - self.min_power) / (settings.powers - 1)
+
+        for i in range(settings.angles):
+            for j in range(settings.powers):
+                self._consider(
+                    arena,
+                    player,
+                    memo,
+                    angle_step * (i + 1),
+                    self.min_power + power_step * j,
+                )
+                yield
+
+        for _ in range(settings.refinements):
+            if self.best.score == 0:
+                return
+
+            angle_step /= 2
+            power_step /= 2
+            centre = self.best
+            for angle in (-angle_step, 0, angle_step):
+                for power in (-power_step, 0, power_step):
+                    if angle or power:
+                        self._consider(
+                            arena,
+                            player,
+                            memo,
+                            centre.angle + angle,
+                            centre.power + power,
+                        )
+                        yield
+
+    def _consider(
+        self,
+        arena: Arena,
+        player: int,
+        memo: dict[tuple[float, float], float],
+        angle: float,
+        power: float,
+    ) -> None:
+        power = min(max(power, self.min_power), self.max_power)
+        score = memo.get((angle, power))
+        if score is None:
+            result = simulate_shot(
+                arena, Shot(angle, power, player), max_time=10.0, record=False
+            )
+            score = memo[(angle, power)] = (
+                0.0 if result.outcome is Outcome.HIT_OPPONENT else result.miss_distance
+            )
+
+        if self.best is None or score < self.best.score:
+            self.best = Candidate(score, angle, power)
@@ -1,3 +1,4 @@
+from bisect import bisect_right
 from operator import attrgetter
 from typing import Any
 from typing import Callable
@@ -5,6 +6,9 @@ from typing import Optional
 from typing import TypeVar
 from typing import Union
 
+import numpy as np
+from numpy.typing import ArrayLike
+
 
 T = TypeVar("T")
 Timestamp = Union[int, float]
@@ -42,6 +46,12 @@ class Timeline:
             ],
             key=attrgetter("timestamp"),
         )
+        self.timestamps = [keyframe.timestamp for keyframe in self.keyframes]
+        self.states = [keyframe.state for keyframe in self.keyframes]
+
+        if not lerp:
+            first = self.states[0]
+            lerp = type(first).lerp if hasattr(first, "lerp") else interpolate
         self.lerp = lerp
 
     def at(self, timestamp: Timestamp) -> Any:
@@ -49,28 +59,86 @@ class Timeline:
         Get the animation state at the specified timestamp
         """
 
-        start = self.keyframes[0]
-        if timestamp <= start.timestamp:
-            return start.state
+        timestamps = self.timestamps
+        if timestamp <= timestamps[0]:
+            return self.states[0]
+
+        if timestamp >= timestamps[-1]:
+            return self.states[-1]
 
-        end = self.keyframes[-1]
-        if timestamp >= end.timestamp:
-            return end.state
+        end = bisect_right(timestamps, timestamp)
+        start = end - 1
+        progress = (timestamp - timestamps[start]) / (
+            timestamps[end] - timestamps[start]
+        )
+        return self.lerp(self.states[start], self.states[end], progress)
 
-        for frame in self.keyframes:
-            if frame.timestamp <= timestamp:
-                start = frame
-                continue
-            if frame.timestamp >= timestamp:
-                end = frame
-                break
+    def at_array(self, timestamps: ArrayLike) -> np.ndarray:
+        """
+        Get the animation states at each of an array of timestamps, interpolated
+        linearly. States must be numbers or sequences of numbers, eg. colours.
+        """
 
-        duration = end.timestamp - start.timestamp
-        progress = (timestamp - start.timestamp) / duration
+        states = np.asarray(self.states, dtype=float)
+        if states.ndim == 1:
+            return np.interp(timestamps, self.timestamps, states)
 
-        lerp = self.lerp
-        if not lerp:
-            lerp = (
-                type(start.state).lerp if hasattr(start.state, "lerp") else interpolate
-            )
-        return lerp(start.state, end.state, progress)
+        return np.stack(
+            [
+                np.interp(timestamps, self.timestamps, component)
+                for component in states.T
+            ],
+            axis=-1,
+        )
+
+    def bake(self, resolution: int = 256) -> "BakedTimeline":
+        """
+        Sample the timeline into a lookup table with the specified number of steps
+        """
+
+        return BakedTimeline(self, resolution)
+
+
+class BakedTimeline:
+    """
+    A Timeline sampled at regular intervals, so a lookup is an index into a table.
+    States are taken from the nearest sample, rather than interpolated.
+    """
+
+    def __init__(self, timeline: Timeline, resolution: int = 256) -> None:
+        self.start = timeline.timestamps[0]
+        self.end = timeline.timestamps[-1]
+        self.resolution = resolution
+        duration = self.end - self.start
+        self.scale = (resolution - 1) / duration if duration else 0
+        self.table = [
+            timeline.at(self.start + step / self.scale if self.scale else self.start)
+            for step in range(resolution)
+        ]
+        try:
+            self.array: Optional[np.ndarray] = np.asarray(self.table, dtype=float)
+        except (TypeError, ValueError):
+            self.array = None
+
+    def at(self, timestamp: Timestamp) -> Any:
+        """
+        Get the animation state at the specified timestamp
+        """
+
+        if timestamp <= self.start:
+            return self.table[0]
+        if timestamp >= self.end:
+            return self.table[-1]
+        return self.table[int((timestamp - self.start) * self.scale + 0.5)]
+
+    def at_array(self, timestamps: ArrayLike) -> np.ndarray:
+        """
+        Get the animation states at each of an array of timestamps
+        """
+
+        if self.array is None:
+            raise TypeError("Only numeric states can be looked up by array")
+
+        steps = (np.asarray(timestamps, dtype=float) - self.start) * self.scale
+        indices = np.clip(steps + 0.5, 0, self.resolution - 1).astype(int)
+        return self.array[indices]
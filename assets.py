@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from typing import Callable
+from typing import Optional
+from typing import TypeVar
+from typing import Union
+
+import pygame
+from pygame import Surface
+from pygame.mask import Mask
+from pygame.mixer import Sound
+
+
+Asset = TypeVar("Asset", Surface, Sound)
+
+
+class Assets:
+    """
+    Loads each image and sound from disk once, and hands out shared references.
+    Images are converted for fast blitting, and their masks built, once each.
+    Everything can be read from disk ahead of time on a background thread; images
+    are converted on the main thread, the first time they are asked for. A file
+    asked for while it is being read waits for that read, rather than reading again.
+    """
+
+    def __init__(
+        self,
+        image_dir: str = "images",
+        sound_dir: str = "sounds",
+        image_ext: str = ".png",
+        sound_ext: str = ".wav",
+    ) -> None:
+        self.image_dir = image_dir
+        self.sound_dir = sound_dir
+        self.image_ext = image_ext
+        self.sound_ext = sound_ext
+        # as read from disk, possibly by the preload thread
+        self.loaded: dict[str, Union[Surface, Sound]] = {}
+        self.images: dict[str, Surface] = {}
+        self.masks: dict[str, Mask] = {}
+        # seconds spent reading and decoding each file
+        self.timings: dict[str, float] = {}
+        # set once a file being read on some thread is done
+        self.loading: dict[str, threading.Event] = {}
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def image(self, path: str) -> Surface:
+        """
+        Get the shared, converted surface of an image file
+        """
+
+        image = self.images.get(path)
+        if image is None:
+            image = self._load(path, pygame.image.load).convert_alpha()
+            self.images[path] = image
+        return image
+
+    def mask(self, path: str) -> Mask:
+        """
+        Get the shared collision mask of an image file
+        """
+
+        mask = self.masks.get(path)
+        if mask is None:
+            mask = self.masks[path] = pygame.mask.from_surface(self.image(path))
+        return mask
+
+    def sound(self, path: str) -> Sound:
+        return self._load(path, Sound)
+
+    def preload(self) -> threading.Thread:
+        """
+        Start reading every image and sound on a background thread
+        """
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._preload, daemon=True)
+            self.thread.start()
+        return self.thread
+
+    def wait(self) -> None:
+        if self.thread is not None:
+            self.thread.join()
+
+    def report(self) -> str:
+        lines = [
+            f"{len(self.timings)} assets loaded in "
+            f"{sum(self.timings.values()) * 1000:.1f}ms"
+        ]
+        for path, seconds in sorted(
+            self.timings.items(), key=lambda item: item[1], reverse=True
+        ):
+            lines.append(f"  {seconds * 1000:7.2f}ms  {path}")
+        return "\n".join(lines)
+
+    def _preload(self) -> None:
+        kinds = [(self.image_dir, self.image_ext, pygame.image.load)]
+        if pygame.mixer.get_init():
+            kinds.append((self.sound_dir, self.sound_ext, Sound))
+        for directory, ext, load in kinds:
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(ext):
+                    self._load(f"{directory}/{filename}", load)
+
+    def _load(self, path: str, load: Callable[[str], Asset]) -> Asset:
+        with self.lock:
+            asset = self.loaded.get(path)
+            if asset is not None:
+                return asset
+            loading = self.loading.get(path)
+            if loading is None:
+                loading = self.loading[path] = threading.Event()
+                reader = True
+            else:
+                reader = False
+
+        if not reader:
+            # already being read on another thread, so wait for it, and read it
+            # here only if that failed
+            loading.wait()
+            return self._load(path, load)
+
+        # read outside the lock, so other files can be asked for meanwhile
+        try:
+            start = time.perf_counter()
+            asset = load(path)
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.loaded[path] = asset
+                self.timings[path] = elapsed
+            return asset
+        finally:
+            with self.lock:
+                del self.loading[path]
+            loading.set()
+
+
+assets = Assets()
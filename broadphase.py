@@ -0,0 +1,80 @@
+from collections import defaultdict
+from typing import Any
+from typing import Iterator
+from typing import Optional
+
+from pygame import Rect
+
+from config import HEIGHT
+from config import WIDTH
+
+
+Cell = tuple[int, int]
+
+
+class SpatialHash:
+    """
+    A uniform grid over the playfield, mapping each cell to the entities with a
+    registered rect overlapping it.
+    An entity may register several rects, eg. the skyline registers each building.
+    """
+
+    def __init__(self, cell_size: int = 64, bounds: Optional[Rect] = None) -> None:
+        self.cell_size = cell_size
+        self.bounds = bounds or Rect(0, 0, WIDTH, HEIGHT)
+        self.cells: defaultdict[Cell, list[tuple[Any, Rect]]] = defaultdict(list)
+        self.entities: dict[Any, list[Rect]] = {}
+
+    def __contains__(self, entity: Any) -> bool:
+        return entity in self.entities
+
+    def insert(self, entity: Any, rect: Optional[Rect] = None) -> None:
+        rect = Rect(entity.rect if rect is None else rect)
+        self.entities.setdefault(entity, []).append(rect)
+        for cell in self._cells(rect):
+            self.cells[cell].append((entity, rect))
+
+    def remove(self, entity: Any) -> None:
+        for rect in self.entities.pop(entity, ()):
+            for cell in self._cells(rect):
+                entries = self.cells[cell]
+                entries[:] = [entry for entry in entries if entry[0] is not entity]
+                if not entries:
+                    del self.cells[cell]
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self.entities.clear()
+
+    def query(self, rect: Rect) -> set[Any]:
+        """
+        Get all entities with a registered rect colliding with the specified rect
+        """
+
+        found = set()
+        for cell in self._cells(rect):
+            for entity, entity_rect in self.cells.get(cell, ()):
+                if entity not in found and entity_rect.colliderect(rect):
+                    found.add(entity)
+        return found
+
+    def near(self, entity: Any, rect: Rect) -> bool:
+        """
+        Check if any rect registered for the entity collides with the specified rect
+        """
+
+        for cell in self._cells(rect):
+            for other, entity_rect in self.cells.get(cell, ()):
+                if other is entity and entity_rect.colliderect(rect):
+                    return True
+        return False
+
+    def _cells(self, rect: Rect) -> Iterator[Cell]:
+        rect = rect.clip(self.bounds)
+        if not rect.width or not rect.height:
+            return
+
+        size = self.cell_size
+        for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for x in range(rect.left // size, (rect.right - 1) // size + 1):
+                yield (x, y)
@@ -0,0 +1,218 @@
+import math
+from bisect import bisect_left
+from bisect import bisect_right
+from typing import Iterable
+from typing import Optional
+
+import numpy as np
+from pygame import Rect
+from pygame.mask import Mask
+
+from simulator import mask_to_array
+from simulator import Point
+
+
+class ColumnTerrain:
+    """
+    Terrain stored as the solid spans of each column of pixels.
+    Each column is a sorted list of span boundaries, top, bottom, top, bottom...,
+    with tops inclusive and bottoms exclusive, so a pixel is solid if an odd number
+    of boundaries are at or above it.
+    Changes only touch the columns they cover, and the whole terrain is a few
+    numbers per column, rather than a bit per pixel.
+    """
+
+    def __init__(
+        self, size: tuple[int, int], columns: Optional[list[list[int]]] = None
+    ) -> None:
+        self.width, self.height = size
+        self.columns = columns or [[] for _ in range(self.width)]
+
+    @classmethod
+    def from_mask(cls, mask: Mask) -> "ColumnTerrain":
+        occupancy = mask_to_array(mask)
+        width, height = occupancy.shape
+        # a boundary is wherever a column changes between empty and solid
+        padded = np.zeros((width, height + 2), np.int8)
+        padded[:, 1:-1] = occupancy
+        x, y = np.nonzero(np.diff(padded, axis=1))
+        ends = np.searchsorted(x, np.arange(width + 1))
+        boundaries = y.tolist()
+        return cls(
+            (width, height),
+            [boundaries[start:end] for start, end in zip(ends[:-1], ends[1:])],
+        )
+
+    @classmethod
+    def from_rects(
+        cls, size: tuple[int, int], rects: Iterable[Rect]
+    ) -> "ColumnTerrain":
+        terrain = cls(size)
+        for rect in rects:
+            terrain.fill(rect)
+        return terrain
+
+    def to_mask(self) -> Mask:
+        mask = Mask((self.width, self.height))
+        # neighbouring columns with the same spans are drawn together, so a
+        # building is a single rect
+        x = 0
+        while x < self.width:
+            column = self.columns[x]
+            end = x + 1
+            while end < self.width and self.columns[end] == column:
+                end += 1
+            for top, bottom in zip(column[::2], column[1::2]):
+                mask.draw(Mask((end - x, bottom - top), fill=True), (x, top))
+            x = end
+        return mask
+
+    def solid(self, x: float, y: float) -> bool:
+        x, y = math.floor(x), math.floor(y)
+        if not 0 <= x < self.width:
+            return False
+        return bisect_right(self.columns[x], y) % 2 == 1
+
+    def top(self, x: float) -> Optional[int]:
+        """
+        Get the highest solid pixel of a column, if any
+        """
+
+        x = math.floor(x)
+        if not 0 <= x < self.width or not self.columns[x]:
+            return None
+        return self.columns[x][0]
+
+    def sweep(self, start: Point, end: Point) -> Optional[tuple[int, int]]:
+        """
+        Get the first solid pixel along a line segment, eg. the path of a projectile
+        over a step, or None if it is clear.
+        Only the columns the segment crosses are searched, one bisect each.
+        """
+
+        (x0, y0), (x1, y1) = start, end
+        first, last = math.floor(x0), math.floor(x1)
+        step = 1 if last >= first else -1
+        slope = (y1 - y0) / (x1 - x0) if x1 != x0 else 0.0
+        for x in range(first, last + step, step):
+            if not 0 <= x < self.width:
+                continue
+            # where the segment enters and leaves this column, in travel order
+            if x1 == x0:
+                enter, leave = math.floor(y0), math.floor(y1)
+            else:
+                if step > 0:
+                    enter_x, leave_x = max(x, x0), min(x + 1, x1)
+                else:
+                    enter_x, leave_x = min(x + 1, x0), max(x, x1)
+                enter = math.floor(y0 + (enter_x - x0) * slope)
+                leave = math.floor(y0 + (leave_x - x0) * slope)
+            y = self._first_solid(self.columns[x], enter, leave)
+            if y is not None:
+                return (x, y)
+        return None
+
+    def fill(self, rect: Rect) -> None:
+        rect = Rect(rect).clip(Rect(0, 0, self.width, self.height))
+        if not rect.height:
+            return
+        columns = self.columns
+        for x in range(rect.left, rect.right):
+            if columns[x]:
+                columns[x] = _add(columns[x], rect.top, rect.bottom)
+            else:
+                columns[x] = [rect.top, rect.bottom]
+
+    def carve(self, center: Point, radius: float) -> Rect:
+        """
+        Remove a circle of terrain, touching only the columns under it.
+        Returns the rect of the columns carved.
+        """
+
+        cx, cy = center
+        left = max(0, math.floor(cx - radius))
+        right = min(self.width, math.ceil(cx + radius))
+        for x in range(left, right):
+            dx = x + 0.5 - cx
+            reach = radius * radius - dx * dx
+            if reach < 0:
+                continue
+            # pixels whose centres are inside the circle
+            half = math.sqrt(reach)
+            top = math.ceil(cy - half - 0.5)
+            bottom = math.floor(cy + half - 0.5) + 1
+            self.columns[x] = _remove(self.columns[x], top, bottom)
+        top = math.ceil(cy - radius - 0.5)
+        return Rect(
+            left, top, max(0, right - left), math.floor(cy + radius + 0.5) - top
+        )
+
+    def erase(self, mask: Mask, offset: tuple[int, int]) -> None:
+        """
+        Remove the set bits of a mask, as Mask.erase does, touching only the columns
+        under it
+        """
+
+        self.subtract(ColumnTerrain.from_mask(mask), offset)
+
+    def subtract(self, other: "ColumnTerrain", offset: tuple[int, int]) -> None:
+        """
+        Remove the solid spans of another terrain, eg. a cached crater stencil,
+        touching only the columns under it
+        """
+
+        offset_x, offset_y = offset
+        for x, column in enumerate(other.columns, start=offset_x):
+            if 0 <= x < self.width:
+                for top, bottom in zip(column[::2], column[1::2]):
+                    self.columns[x] = _remove(
+                        self.columns[x], top + offset_y, bottom + offset_y
+                    )
+
+    def changed_columns(self, other: "ColumnTerrain") -> list[int]:
+        """
+        Get the columns which differ from another terrain of the same size
+        """
+
+        return [
+            x
+            for x, (column, other_column) in enumerate(zip(self.columns, other.columns))
+            if column != other_column
+        ]
+
+    @staticmethod
+    def _first_solid(column: list[int], enter: int, leave: int) -> Optional[int]:
+        index = bisect_right(column, enter)
+        if index % 2:
+            return enter
+        if leave >= enter:
+            # heading down, to the top of the next span
+            if index < len(column) and column[index] <= leave:
+                return column[index]
+        elif index and column[index - 1] - 1 >= leave:
+            # heading up, to the bottom of the span above
+            return column[index - 1] - 1
+        return None
+
+
+def _add(column: list[int], top: int, bottom: int) -> list[int]:
+    if top >= bottom:
+        return column
+    start = bisect_left(column, top)
+    end = bisect_right(column, bottom)
+    # the new span joins any it touches or overlaps
+    return (
+        column[:start]
+        + [top] * (1 - start % 2)
+        + [bottom] * (1 - end % 2)
+        + column[end:]
+    )
+
+
+def _remove(column: list[int], top: int, bottom: int) -> list[int]:
+    if top >= bottom:
+        return column
+    start = bisect_left(column, top)
+    end = bisect_right(column, bottom)
+    # spans cut in two keep their ends either side of the gap
+    return column[:start] + [top] * (start % 2) + [bottom] * (end % 2) + column[end:]
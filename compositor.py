@@ -0,0 +1,131 @@
+from typing import Callable
+from typing import Iterable
+from typing import Optional
+
+from pygame import Rect
+from pygame import Surface
+
+from type_defs import Size
+from util import merge_rects
+
+
+LayerRenderer = Callable[[Surface], Iterable[Rect]]
+
+
+class Layer:
+    """
+    A named step of a frame, drawn by a function which returns the rects it drew to.
+    Cached layers are drawn once into the compositor's background, and only drawn
+    again where they are invalidated.
+    """
+
+    def __init__(self, name: str, render: LayerRenderer, cached: bool = False) -> None:
+        self.name = name
+        self.render = render
+        self.cached = cached
+        # regions of a cached layer that changed since it was last drawn, or None
+        # if all of it did
+        self.invalidated: Optional[list[Rect]] = None
+
+
+class Compositor:
+    """
+    Draws a stack of layers, bottom first, onto a surface which is expected to keep
+    the last frame drawn to it.
+    Cached layers must be at the bottom of the stack, and the lowest must be opaque.
+    Uncached layers are drawn every frame, and the background is restored beneath
+    whatever they drew the frame before.
+    """
+
+    def __init__(self, size: Size, layers: Iterable[Layer]) -> None:
+        self.size = size
+        self.layers = {layer.name: layer for layer in layers}
+        self.cached = [layer for layer in self.layers.values() if layer.cached]
+        if any(
+            layer.cached for layer in list(self.layers.values())[len(self.cached) :]
+        ):
+            raise ValueError("Cached layers must be at the bottom of the stack")
+        self.background: Optional[Surface] = None
+        self.target: Optional[Surface] = None
+        self.dirty: Optional[list[Rect]] = None
+        self.drawn: list[Rect] = []
+
+    def invalidate(self, rect: Optional[Rect] = None) -> None:
+        """
+        Mark a region of the surface last drawn to as needing a redraw, eg. because
+        something else was drawn over it, or all of it if no rect is given
+        """
+
+        if rect is None:
+            self.dirty = None
+        elif self.dirty is not None:
+            self.dirty.append(Rect(rect))
+
+    def invalidate_layer(self, name: str, rect: Optional[Rect] = None) -> None:
+        """
+        Mark a region of a layer as changed, or all of it if no rect is given
+        """
+
+        layer = self.layers[name]
+        if layer.cached:
+            if rect is None:
+                layer.invalidated = None
+            elif layer.invalidated is not None:
+                layer.invalidated.append(Rect(rect))
+        self.invalidate(rect)
+
+    def render(self, surface: Surface) -> Optional[list[Rect]]:
+        """
+        Draw a frame. If the surface still holds the last frame, only regions which
+        were invalidated or drawn to last frame are restored from the background.
+        Returns the changed rects, or None if the whole surface was redrawn.
+        """
+
+        self._update_background()
+
+        if surface is not self.target or self.dirty is None:
+            surface.blit(self.background, (0, 0))
+            restored = None
+        else:
+            bounds = surface.get_rect()
+            restored = merge_rects(
+                rect.clip(bounds) for rect in self.dirty + self.drawn
+            )
+            surface.blits(
+                [(self.background, rect, rect) for rect in restored],
+                doreturn=False,
+            )
+
+        drawn: list[Rect] = []
+        for layer in self.layers.values():
+            if not layer.cached:
+                drawn += layer.render(surface)
+
+        self.target = surface
+        self.dirty = []
+        self.drawn = drawn
+        if restored is None:
+            return None
+        return merge_rects(restored + drawn)
+
+    def _update_background(self) -> None:
+        if self.background is None:
+            self.background = Surface(self.size).convert()
+            for layer in self.cached:
+                layer.invalidated = None
+
+        if any(layer.invalidated is None for layer in self.cached):
+            rects = [self.background.get_rect()]
+        else:
+            rects = merge_rects(
+                rect for layer in self.cached for rect in layer.invalidated
+            )
+
+        for rect in rects:
+            self.background.set_clip(rect)
+            for layer in self.cached:
+                layer.render(self.background)
+        self.background.set_clip(None)
+
+        for layer in self.cached:
+            layer.invalidated = []
@@ -1,11 +1,16 @@
 import random
+from functools import lru_cache
+from typing import NamedTuple
 
 import pygame
 from pygame import Color
 from pygame import Rect
 from pygame import Surface
+from pygame.constants import SRCALPHA
+from pygame.mask import Mask
 from pygame.math import Vector2
 
+from column_terrain import ColumnTerrain
 from config import HEIGHT
 from config import WIDTH
 from event import Event
@@ -17,28 +22,55 @@ from particle import fade_out
 from particle import gravity
 from particle import growth
 from particle import lifetime
-from particle import Particle
 from particle import ParticleStream
+from particle import pool
 from type_defs import Vector
 
 
+class Crater(NamedTuple):
+    mask: Mask
+    columns: ColumnTerrain
+
+
+@lru_cache(maxsize=None)
+def crater(radius: int) -> Crater:
+    """
+    Get the stencil of a crater, built once per radius
+    """
+
+    surface = Surface((radius * 2, radius * 2), SRCALPHA)
+    pygame.draw.circle(surface, Color(255, 255, 255), (radius, radius), radius)
+    mask = pygame.mask.from_surface(surface)
+    return Crater(mask, ColumnTerrain.from_mask(mask))
+
+
 class Explosion:
-    HEIGHT = 64
-    WIDTH = 64
+    """
+    A crater to blow in the terrain, sharing its stencil with every other crater of
+    the same radius
+    """
 
-    def __init__(self, pos: Vector) -> None:
-        self.surface = Surface((self.WIDTH, self.HEIGHT))
-        pygame.draw.circle(
-            self.surface,
-            Color(255, 255, 255),
-            (self.WIDTH / 2, self.HEIGHT / 2),
-            self.WIDTH / 2,
-            width=0,
-        )
-        self.mask = pygame.mask.from_surface(self.surface)
-        self.rect = self.surface.get_rect(center=pos)
+    RADIUS = 32
+    MIN_RADIUS = 16
+    MAX_RADIUS = 48
+    # impacts at this speed make craters of the standard radius
+    REFERENCE_SPEED = 100
+
+    def __init__(self, pos: Vector, radius: int = RADIUS) -> None:
+        self.radius = radius
+        self.mask, self.columns = crater(radius)
+        self.rect = self.mask.get_rect(center=pos)
         self.pos = Vector2(*pos)
 
+    @classmethod
+    def from_impact(cls, pos: Vector, speed: float) -> "Explosion":
+        """
+        Make a crater scaled by the speed of the impact
+        """
+
+        radius = round(cls.RADIUS * speed / cls.REFERENCE_SPEED)
+        return cls(pos, min(max(radius, cls.MIN_RADIUS), cls.MAX_RADIUS))
+
 
 class ExplosionEmitter(Emitter, EventSource):
     def __init__(self, pos: Vector) -> None:
@@ -74,17 +106,19 @@ def explosion_debris(bounds, callback) -> ParticleStream:
             if len(p) == 0:
                 callback()
 
+    forces = (
+        gravity(),
+        age(1),
+        fade_out(3),
+        lifetime(3),
+        boundary(bounds, callback=decrement_count(particles)),
+    )
+
     for _ in range(count):
-        p = Particle(
+        p = pool.acquire(
             colour=Color(255, 255, 255),
             size=Vector2(2, 2),
-            forces=(
-                gravity(),
-                age(1),
-                fade_out(3),
-                lifetime(3),
-                boundary(bounds, callback=decrement_count(particles)),
-            ),
+            forces=forces,
             velocity=Vector2(random.randint(0, 50), 0).rotate(random.randint(0, 360)),
         )
         particles.append(p)
@@ -100,14 +134,15 @@ def explosion_flames():
         Color(226, 118, 18),
         Color(227, 222, 18),
     )
+    forces = (
+        age(1),
+        growth(-200),
+        lifetime(1.5),
+    )
     yield [
-        Particle(
+        pool.acquire(
             colour=flame_colours[0].lerp(flame_colours[1], random.random()),
-            forces=(
-                age(1),
-                growth(-200),
-                lifetime(1.5),
-            ),
+            forces=forces,
             velocity=Vector2(random.randint(10, 40), 0).rotate(random.randint(0, 360)),
             size=random.randint(100, 200),
         )
@@ -1,6 +1,11 @@
+from typing import Optional
+
+from pygame import K_1
+from pygame import K_2
 from pygame import K_r
 from pygame import K_t
 from pygame import K_w
+from pygame import Rect
 
 from screens import GameOver
 from screens import GetReady
@@ -51,6 +56,10 @@ class Game(ScreenManager):
 
         self.current_state = menu
 
+    def render(self, surface, interpolation: float = 1.0) -> Optional[list[Rect]]:
+        self.world.interpolation = interpolation
+        return super().render(surface)
+
     def done(self) -> bool:
         return any(score > 2 for score in self.world.scoreboard)
 
@@ -61,6 +70,10 @@ class Game(ScreenManager):
             self.world.change_wind()
         if args[0] == K_r:
             self.world.reset()
+        if args[0] == K_1:
+            self.world.toggle_computer(0)
+        if args[0] == K_2:
+            self.world.toggle_computer(1)
         self.current_state.on_key_up(*args, **kwargs)
 
     def on_mouse_down(self, *args, **kwargs) -> None:
@@ -1,6 +1,6 @@
-import pygame
 from pygame.math import Vector2
 
+from assets import assets
 from type_defs import Vector
 from util import Renderable
 
@@ -10,7 +10,7 @@ class Gorilla(Renderable):
     WIDTH = 64
 
     def __init__(self, pos: Vector) -> None:
-        self.surface = pygame.image.load("images/gorilla.png").convert_alpha()
-        self.mask = pygame.mask.from_surface(self.surface)
+        self.surface = assets.image("images/gorilla.png")
+        self.mask = assets.mask("images/gorilla.png")
         self.rect = self.surface.get_rect(center=pos)
         self.pos = Vector2(*pos)
@@ -1,7 +1,12 @@
+import numpy as np
+import pygame
 from pygame import Color
 from pygame import Surface
+from pygame.constants import SRCALPHA
 from pygame.transform import scale
 
+from config import GRADIENT_CACHE_BYTES
+from sprite_cache import SpriteCache
 from type_defs import Size
 
 
@@ -21,18 +26,33 @@ class Gradient:
         )
 
     def get_surface(self, size: Size, horizontal: bool = False):
+        """
+        Get a surface filled with the gradient, from the cache if possible.
+        The surface is shared, so copy it before drawing on it.
+        """
+
         width, height = map(int, (*size,))
-        x, y = (0, 1)
-        max_value = height
-        surface_size = (1, height)
-        if horizontal:
-            x, y = (1, 0)
-            max_value = width
-            surface_size = (width, 1)
-        surface = Surface(surface_size).convert_alpha()
-        for i in range(max_value):
-            surface.set_at(
-                (x * i, y * i),
-                self.start.lerp(self.end, (i / max_value)),
-            )
-        return scale(surface, (width, height))
+        key = (tuple(self.start), tuple(self.end), (width, height), horizontal)
+        return gradients.get(key, lambda: self._render((width, height), horizontal))
+
+    def _render(self, size: tuple[int, int], horizontal: bool) -> Surface:
+        width, height = size
+        steps = width if horizontal else height
+        start = np.array(self.start, dtype=float)
+        end = np.array(self.end, dtype=float)
+        quotient = np.arange(steps)[:, np.newaxis] / steps
+        # same rounding as Color.lerp
+        colours = start * (1 - quotient) + end * quotient + 0.5
+
+        strip_size = (steps, 1) if horizontal else (1, steps)
+        strip = Surface(strip_size, SRCALPHA).convert_alpha()
+        pixels = pygame.surfarray.pixels3d(strip)
+        pixels[...] = colours[:, :3].reshape(pixels.shape)
+        del pixels
+        alpha = pygame.surfarray.pixels_alpha(strip)
+        alpha[...] = colours[:, 3].reshape(alpha.shape)
+        del alpha
+        return scale(strip, size)
+
+
+gradients = SpriteCache(max_bytes=GRADIENT_CACHE_BYTES)
@@ -1,8 +1,13 @@
 import pygame
 
+from assets import assets
+from config import DIRTY_RECTS
+from config import FRAME_RATE
 from config import HEIGHT
+from config import REPORT_ASSET_TIMINGS
 from config import WIDTH
 from game import Game
+from timestep import FixedTimestep
 
 
 def main():
@@ -10,17 +15,28 @@ def main():
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Gorilla Shootout")
     clock = pygame.time.Clock()
+    timestep = FixedTimestep()
 
+    # with no display to show frames on, simulate as fast as possible
+    headless = pygame.display.get_driver() == "dummy"
+
+    # whatever the game does not load while starting up is read during the menu
+    assets.preload()
     game = Game()
 
     game.render(screen)
     pygame.display.flip()
 
     while True:
-        dt = clock.tick(60) / 1000.0
+        if headless:
+            elapsed = timestep.dt
+        else:
+            elapsed = clock.tick(FRAME_RATE) / 1000.0
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if REPORT_ASSET_TIMINGS:
+                    print(assets.report())
                 return
             if event.type == pygame.KEYUP:
                 game.on_key_up(event.key, event.mod)
@@ -31,10 +47,13 @@ def main():
             if event.type == pygame.MOUSEMOTION:
                 game.on_mouse_move(event.pos, event.rel, event.buttons)
 
-        game.update(dt)
+        timestep.advance(elapsed, game.update)
 
-        game.render(screen)
-        pygame.display.flip()
+        rects = game.render(screen, timestep.interpolation)
+        if DIRTY_RECTS and rects is not None:
+            pygame.display.update(rects)
+        else:
+            pygame.display.flip()
 
 
 if __name__ == "__main__":
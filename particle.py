@@ -1,19 +1,20 @@
 import sys
-from functools import cached_property
 from itertools import islice
+from itertools import repeat
 from typing import Callable
 from typing import Iterable
 from typing import Optional
 from typing import Union
 
-import pygame
 from pygame import Color
 from pygame import Rect
 from pygame import Surface
 from pygame.math import Vector2
 
 from animation import Timeline
+from broadphase import SpatialHash
 from config import SPEED_FUDGE
+from sprite_cache import sprites
 from type_defs import Translation
 from type_defs import Vector
 from util import identity_translation
@@ -29,8 +30,27 @@ class Particle:
     A particle with position, size, velocity, age, and optional colour, mass and a
     surface for rendering.
     May be influenced by a number of Forces, which are applied in sequence at update.
+    Particles created from the same tuple of forces share it rather than copying it.
     """
 
+    __slots__ = (
+        "pos",
+        "last_pos",
+        "velocity",
+        "alpha",
+        "mass",
+        "drag_coefficient",
+        "forces",
+        "age",
+        "width",
+        "height",
+        "_original_surface",
+        "_surface",
+        "_scale",
+        "_angle",
+        "_colour",
+    )
+
     def __init__(
         self,
         pos: Optional[Vector2] = None,
@@ -46,56 +66,71 @@ class Particle:
         forces: Optional[Iterable[Force]] = None,
     ) -> None:
         self.pos = pos or Vector2(0, 0)
+        self.last_pos: Optional[tuple[float, float]] = None
         self.velocity = velocity or Vector2(0, 0)
         self.alpha = 255 if alpha is None else alpha
         self.mass = mass
         self.drag_coefficient = drag_coefficient
-        self.forces = list(forces) if forces is not None else []
+        if forces is None:
+            forces = ()
+        self.forces: tuple[Force, ...] = (
+            forces if isinstance(forces, tuple) else tuple(forces)
+        )
         self.age: float = 0
 
         self._original_surface = surface
+        self._surface = None
         self._scale = scale
         self._angle = angle
         self._colour = colour
 
         if surface:
-            self.size = Vector2(surface.get_size())
-            self._scale = scale
-            self._angle = angle
+            self.width, self.height = surface.get_size()
 
         else:
             if isinstance(size, int):
-                self.size = Vector2(size, size)
+                self.width = self.height = size
             else:
-                self.size = size or Vector2(1, 1)
-            self.rect.center = (int(self.pos.x), int(self.pos.y))
+                self.width, self.height = size or (1, 1)
             self._colour = colour or Color(255, 255, 255)
 
-    @cached_property
+    @property
     def surface(self):
-        if self._original_surface:
-            surface = pygame.transform.rotozoom(
-                self._original_surface, self.angle, self.scale
-            )
+        if self._surface is None:
+            if self._original_surface:
+                self._surface = sprites.rotozoom(
+                    self._original_surface, self._angle, self._scale
+                )
 
-        else:
-            surface = Surface(self.size * self.scale).convert_alpha()
-            pygame.draw.circle(
-                surface,
-                self.colour,
-                center=(self.size / 2) * self.scale,
-                radius=(max(*self.size) / 2) * self.scale,
-            )
+            else:
+                self._surface = sprites.circle(
+                    self._colour,
+                    self.width * self._scale,
+                    self.height * self._scale,
+                )
 
-        return surface
+        return self._surface
+
+    @property
+    def size(self) -> Vector2:
+        return Vector2(self.width, self.height)
+
+    @size.setter
+    def size(self, size: Vector) -> None:
+        self.width, self.height = size
 
     @property
     def topleft(self):
-        return self.pos - self.size / 2
+        return Vector2(self.pos.x - self.width / 2, self.pos.y - self.height / 2)
 
     @property
     def rect(self):
-        return Rect(self.topleft, self.size)
+        return Rect(
+            self.pos.x - self.width / 2,
+            self.pos.y - self.height / 2,
+            self.width,
+            self.height,
+        )
 
     @property
     def angle(self) -> float:
@@ -105,7 +140,7 @@ class Particle:
     def angle(self, angle: float) -> None:
         self._angle = angle
         self._update_surface()
-        self.size = Vector2(self.surface.get_size())
+        self.width, self.height = self.surface.get_size()
 
     @property
     def scale(self) -> float:
@@ -115,7 +150,7 @@ class Particle:
     def scale(self, scale: float) -> None:
         self._scale = scale
         self._update_surface()
-        self.size = Vector2(self.surface.get_size())
+        self.width, self.height = self.surface.get_size()
 
     @property
     def colour(self) -> Optional[Color]:
@@ -127,11 +162,25 @@ class Particle:
         self._update_surface()
 
     def update(self, dt: float) -> None:
+        self.last_pos = (self.pos.x, self.pos.y)
         for force in self.forces:
             force(self, dt)
 
         self.pos += self.velocity * dt * SPEED_FUDGE
 
+    def interpolate(self, quotient: float) -> tuple[float, float]:
+        """
+        Get the position between the previous and current update
+        """
+
+        if self.last_pos is None:
+            return (self.pos.x, self.pos.y)
+        last_x, last_y = self.last_pos
+        return (
+            last_x + (self.pos.x - last_x) * quotient,
+            last_y + (self.pos.y - last_y) * quotient,
+        )
+
     def kill(self) -> None:
         self.age = -1
 
@@ -148,14 +197,37 @@ class Particle:
         self._update_surface()
 
     def _update_surface(self):
-        try:
-            del self.surface
-        except AttributeError:
-            pass
+        self._surface = None
 
     @property
     def mask(self):
-        return pygame.mask.from_surface(self.surface)
+        return sprites.mask(self.surface)
+
+
+class ParticlePool:
+    """
+    A free list of dead particles, which are reinitialised in place instead of
+    allocating new ones
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        self.free: list[Particle] = []
+        self.max_size = max_size
+
+    def acquire(self, *args, **kwargs) -> Particle:
+        if not self.free:
+            return Particle(*args, **kwargs)
+
+        particle = self.free.pop()
+        particle.__init__(*args, **kwargs)
+        return particle
+
+    def release(self, particle: Particle) -> None:
+        if len(self.free) < self.max_size:
+            self.free.append(particle)
+
+
+pool = ParticlePool()
 
 
 class Emitter:
@@ -164,7 +236,10 @@ class Emitter:
     """
 
     def __init__(
-        self, pos: Optional[Vector] = None, max_particles: int = sys.maxsize
+        self,
+        pos: Optional[Vector] = None,
+        max_particles: int = sys.maxsize,
+        particle_pool: ParticlePool = pool,
     ) -> None:
         self.particles: list[Particle] = []
         self.pos = Vector2(0, 0)
@@ -172,34 +247,76 @@ class Emitter:
             self.pos = Vector2(*pos)
         self.max_particles = max_particles
         self.streams: list[ParticleStream] = []
+        self.pool = particle_pool
+
+    @property
+    def full(self) -> bool:
+        return len(self.particles) >= self.max_particles
 
     def add_stream(self, stream: ParticleStream, pre_fill: int = 0) -> None:
         self.streams.append(stream)
         for particles in islice(stream, pre_fill):
-            for p in particles:
-                if len(self.particles) < self.max_particles:
-                    p.pos += self.pos
-                    self.particles.append(p)
+            self.emit(particles)
+
+    def emit(self, particles: Iterable[Particle]) -> None:
+        for p in particles:
+            if len(self.particles) < self.max_particles:
+                p.pos += self.pos
+                self.particles.append(p)
+            else:
+                self.pool.release(p)
 
     def update(self, dt: float) -> None:
         for stream in self.streams:
-            for p in next(stream):
-                if len(self.particles) < self.max_particles:
-                    p.pos += self.pos
-                    self.particles.append(p)
-
-        for p in self.particles[:]:
+            self.emit(next(stream))
+
+        # swap each killed particle with the last one and pop it, so removal does
+        # not depend on how many particles are alive
+        particles = self.particles
+        i = 0
+        while i < len(particles):
+            p = particles[i]
             p.update(dt)
             if p.killed:
-                self.particles.remove(p)
+                last = particles.pop()
+                if last is not p:
+                    particles[i] = last
+                self.pool.release(p)
+            else:
+                i += 1
 
     def render(
-        self, surface, camera_translate_fn: Optional[Translation] = None
-    ) -> None:
-        if camera_translate_fn is None:
-            camera_translate_fn = identity_translation
+        self,
+        surface,
+        camera_translate_fn: Optional[Translation] = None,
+        interpolation: float = 1.0,
+    ) -> list[Rect]:
+        """
+        Draw all particles, with one blits call per distinct sprite and alpha.
+        The camera translation is treated as an offset for the whole batch.
+        Particles are drawn the specified fraction of the way from their previous
+        to their current position.
+        Returns the rects drawn to.
+        """
+
+        offset_x, offset_y = 0, 0
+        if camera_translate_fn is not None:
+            offset_x, offset_y = camera_translate_fn(Vector2(0, 0))
+
+        batches: dict[tuple[Surface, int], list[tuple[float, float]]] = {}
         for p in self.particles:
-            p.render(surface, camera_translate_fn)
+            x, y = p.interpolate(interpolation)
+            dest = (
+                x - p.width / 2 + offset_x,
+                y - p.height / 2 + offset_y,
+            )
+            batches.setdefault((p.surface, int(p.alpha)), []).append(dest)
+
+        rects: list[Rect] = []
+        for (sprite, alpha), dests in batches.items():
+            sprite.set_alpha(alpha)
+            rects += surface.blits(zip(repeat(sprite), dests))
+        return rects
 
 
 def age(amount: float) -> Force:
@@ -271,7 +388,7 @@ def fade_out(duration: float, start: float = 0.0) -> Force:
     alpha_gradient = Timeline(
         (start, 255),
         (start + duration, 0),
-    )
+    ).bake()
 
     def _fade_out(particle: Particle, _) -> None:
         particle.alpha = alpha_gradient.at(particle.age)
@@ -286,7 +403,7 @@ def growth(amount: float) -> Force:
 
     def _grow(particle: Particle, dt: float) -> None:
         particle.scale = max(
-            (particle.size.x + amount * dt) / max(particle.size.x, 0.00001), 0
+            (particle.width + amount * dt) / max(particle.width, 0.00001), 0
         )
 
     return _grow
@@ -321,13 +438,20 @@ def boundary(
     return _oob
 
 
-def collide_mask(other, callback: Optional[Callback] = None) -> Force:
+def collide_mask(
+    other, callback: Optional[Callback] = None, index: Optional[SpatialHash] = None
+) -> Force:
     """
-    Kill particles that collide with the specified entity mask
+    Kill particles that collide with the specified entity mask.
+    If a broadphase index is given, the mask is only tested when one of the rects
+    the entity registered there is near the particle.
     """
 
     def _mask(particle: Particle, _) -> None:
-        if not other.rect.colliderect(particle.rect):
+        if index is not None:
+            if not index.near(other, particle.rect):
+                return
+        elif not other.rect.colliderect(particle.rect):
             return
 
         if other.mask.overlap(
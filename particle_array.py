@@ -0,0 +1,409 @@
+import sys
+from itertools import repeat
+from typing import Callable
+from typing import Iterable
+from typing import Optional
+
+import numpy as np
+import pygame
+from pygame import Color
+from pygame import Rect
+from pygame import Surface
+from pygame.constants import SRCALPHA
+from pygame.math import Vector2
+
+from animation import Timeline
+from config import SPEED_FUDGE
+from particle import Emitter
+from particle import Particle
+from particle import ParticlePool
+from particle import pool
+from type_defs import Translation
+from type_defs import Vector
+from util import identity_translation
+
+
+ArrayCallback = Callable[["ParticleArray", np.ndarray], None]
+ArrayForce = Callable[["ParticleArray", float], None]
+
+
+class ParticleArray:
+    """
+    Structure-of-arrays particle storage.
+    Live particles are packed at the front of each array, and the public attributes
+    are views of just the live part, so a force is a single pass over each array.
+    """
+
+    FIELDS = (
+        "pos",
+        "last_pos",
+        "velocity",
+        "age",
+        "alpha",
+        "mass",
+        "drag_coefficient",
+        "size",
+        "colour",
+        "killed",
+    )
+
+    def __init__(self, capacity: int = 256) -> None:
+        self.count = 0
+        self._pos = np.zeros((capacity, 2))
+        self._last_pos = np.zeros((capacity, 2))
+        self._velocity = np.zeros((capacity, 2))
+        self._age = np.zeros(capacity)
+        self._alpha = np.zeros(capacity)
+        self._mass = np.zeros(capacity)
+        self._drag_coefficient = np.zeros(capacity)
+        self._size = np.zeros(capacity, dtype=np.int32)
+        self._colour = np.zeros((capacity, 4), dtype=np.uint8)
+        self._killed = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def capacity(self) -> int:
+        return len(self._age)
+
+    @property
+    def pos(self) -> np.ndarray:
+        return self._pos[: self.count]
+
+    @property
+    def last_pos(self) -> np.ndarray:
+        return self._last_pos[: self.count]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._velocity[: self.count]
+
+    @property
+    def age(self) -> np.ndarray:
+        return self._age[: self.count]
+
+    @property
+    def alpha(self) -> np.ndarray:
+        return self._alpha[: self.count]
+
+    @property
+    def mass(self) -> np.ndarray:
+        return self._mass[: self.count]
+
+    @property
+    def drag_coefficient(self) -> np.ndarray:
+        return self._drag_coefficient[: self.count]
+
+    @property
+    def size(self) -> np.ndarray:
+        return self._size[: self.count]
+
+    @property
+    def colour(self) -> np.ndarray:
+        return self._colour[: self.count]
+
+    @property
+    def killed(self) -> np.ndarray:
+        return self._killed[: self.count]
+
+    def reserve(self, capacity: int) -> None:
+        if capacity <= self.capacity:
+            return
+
+        capacity = max(capacity, self.capacity * 2)
+        for field in self.FIELDS:
+            old = getattr(self, f"_{field}")
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[: self.count] = old[: self.count]
+            setattr(self, f"_{field}", new)
+
+    def add(
+        self,
+        count: int,
+        pos: Vector = (0, 0),
+        velocity: Vector = (0, 0),
+        alpha: float = 255,
+        mass: float = 0,
+        drag_coefficient: float = 0.47,
+        size: int = 1,
+        colour: Color = Color(255, 255, 255),
+    ) -> slice:
+        """
+        Add a batch of particles. Every field may be a scalar or an array with one
+        entry per particle.
+        """
+
+        start = self.count
+        self.reserve(start + count)
+        self.count += count
+        added = slice(start, self.count)
+        self._pos[added] = pos
+        self._last_pos[added] = self._pos[added]
+        self._velocity[added] = velocity
+        self._age[added] = 0
+        self._alpha[added] = alpha
+        self._mass[added] = mass
+        self._drag_coefficient[added] = drag_coefficient
+        self._size[added] = size
+        self._colour[added] = tuple(colour) if isinstance(colour, Color) else colour
+        self._killed[added] = False
+        return added
+
+    def add_particle(self, particle: Particle, offset: Vector = (0, 0)) -> None:
+        self.add(
+            1,
+            pos=particle.pos + Vector2(*offset),
+            velocity=particle.velocity,
+            alpha=particle.alpha,
+            mass=particle.mass,
+            drag_coefficient=particle.drag_coefficient,
+            size=int(max(particle.width, particle.height)),
+            colour=particle.colour or Color(255, 255, 255),
+        )
+        self._age[self.count - 1] = particle.age
+
+    def kill(self, which: np.ndarray) -> None:
+        self.killed[which] = True
+
+    def compact(self) -> None:
+        """
+        Drop killed particles, keeping the live ones packed at the front
+        """
+
+        alive = ~self.killed
+        remaining = int(np.count_nonzero(alive))
+        if remaining == self.count:
+            return
+
+        for field in self.FIELDS:
+            array = getattr(self, f"_{field}")
+            array[:remaining] = array[: self.count][alive]
+        self.count = remaining
+
+
+class ArrayEmitter(Emitter):
+    """
+    An Emitter that keeps its particles in a ParticleArray and updates them with
+    vectorized forces.
+    Particles emitted by streams are copied into the arrays, unless they carry their
+    own forces, in which case they are updated one by one as in a plain Emitter.
+    """
+
+    def __init__(
+        self,
+        pos: Optional[Vector] = None,
+        max_particles: int = sys.maxsize,
+        forces: Iterable[ArrayForce] = (),
+        particle_pool: ParticlePool = pool,
+    ) -> None:
+        super().__init__(pos, max_particles, particle_pool)
+        self.array = ParticleArray()
+        self.forces = tuple(forces)
+        self._sprites: dict[int, Surface] = {}
+
+    def __len__(self) -> int:
+        return len(self.particles) + self.array.count
+
+    def emit(self, particles: Iterable[Particle]) -> None:
+        for p in particles:
+            if len(self) >= self.max_particles:
+                self.pool.release(p)
+            elif p.forces:
+                p.pos += self.pos
+                self.particles.append(p)
+            else:
+                self.array.add_particle(p, self.pos)
+                self.pool.release(p)
+
+    def spawn(self, count: int, **fields) -> None:
+        """
+        Add a batch of particles directly to the arrays, bypassing Particle objects.
+        Positions are relative to the emitter.
+        """
+
+        count = min(count, self.max_particles - len(self))
+        if count <= 0:
+            return
+
+        added = self.array.add(count, **fields)
+        self.array._pos[added] += self.pos
+        self.array._last_pos[added] = self.array._pos[added]
+
+    def update(self, dt: float) -> None:
+        super().update(dt)
+
+        particles = self.array
+        if not particles.count:
+            return
+
+        particles.last_pos[:] = particles.pos
+        for force in self.forces:
+            force(particles, dt)
+
+        particles.pos[:] += particles.velocity * dt * SPEED_FUDGE
+        particles.compact()
+
+    def render(
+        self,
+        surface,
+        camera_translate_fn: Optional[Translation] = None,
+        interpolation: float = 1.0,
+    ) -> list[Rect]:
+        rects = super().render(surface, camera_translate_fn, interpolation)
+
+        particles = self.array
+        if not particles.count:
+            return rects
+
+        if camera_translate_fn is None:
+            camera_translate_fn = identity_translation
+        offset = np.array(camera_translate_fn(Vector2(0, 0)))
+
+        pos = particles.last_pos + (particles.pos - particles.last_pos) * interpolation
+        topleft = (pos - particles.size[:, None] / 2 + offset).astype(int)
+        alpha = np.clip(particles.alpha, 0, 255).astype(np.int64) >> 4
+        keys = (
+            particles.colour.view(np.uint32).ravel().astype(np.int64) << 24
+            | particles.size.astype(np.int64) << 4
+            | alpha
+        )
+        order = np.argsort(keys, kind="stable")
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        groups = np.split(topleft[order], starts[1:])
+        for key, coords in zip(unique_keys.tolist(), groups):
+            sprite = self._sprite(key)
+            rects += surface.blits(zip(repeat(sprite), coords.tolist()))
+        return rects
+
+    def _sprite(self, key: int) -> Surface:
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            colour = np.array([key >> 24], dtype=np.uint32).view(np.uint8)
+            size = max((key >> 4) & 0xFFFFF, 1)
+            sprite = Surface((size, size), SRCALPHA)
+            pygame.draw.circle(
+                sprite,
+                Color(*colour.tolist()),
+                center=(size / 2, size / 2),
+                radius=size / 2,
+            )
+            sprite.set_alpha((key & 0xF) * 17)
+            self._sprites[key] = sprite
+        return sprite
+
+
+def age(amount: float) -> ArrayForce:
+    """
+    Ages particles at a specified rate
+    """
+
+    def _age(particles: ParticleArray, dt: float) -> None:
+        particles.age[:] += amount * dt
+
+    return _age
+
+
+def gravity(accel: Vector = (0, 9.8)) -> ArrayForce:
+    """
+    Applies a fixed acceleration to particles
+    """
+
+    acceleration = np.array([*accel], dtype=float) * SPEED_FUDGE
+
+    def _gravity(particles: ParticleArray, dt: float) -> None:
+        particles.velocity[:] += acceleration * dt
+
+    return _gravity
+
+
+def drag(
+    linear_coefficient: float,
+    squared_coefficient: float = 0.0,
+    fluid_velocity: Optional[Vector2] = None,
+    domain: Optional[Rect] = None,
+) -> ArrayForce:
+    """
+    Simulate viscous drag in a fluid
+    """
+
+    # a value close to zero used to avoid infinite forces
+    epsilon = 0.00001
+
+    fluid = np.zeros(2) if fluid_velocity is None else np.array([*fluid_velocity])
+
+    def _drag(particles: ParticleArray, dt: float) -> None:
+        rvel = (particles.velocity - fluid) * dt
+        rmag = np.einsum("ij,ij->i", rvel, rvel)
+        active = ~particles.killed & (rmag > epsilon)
+        if domain is not None:
+            active &= _inside(particles.pos, domain)
+        if not active.any():
+            return
+
+        rvel = rvel[active]
+        rmag = rmag[active]
+        drag = linear_coefficient * rmag + squared_coefficient * rmag * rmag
+        mass = np.maximum(particles.mass[active], epsilon)
+        particles.velocity[active] -= rvel * (drag / (rmag * mass))[:, None]
+
+    return _drag
+
+
+def fade_out(duration: float, start: float = 0.0) -> ArrayForce:
+    """
+    Change particle alpha to transparent based on age
+    """
+
+    alpha_gradient = Timeline(
+        (start, 255),
+        (start + duration, 0),
+    )
+
+    def _fade_out(particles: ParticleArray, _) -> None:
+        particles.alpha[:] = alpha_gradient.at_array(particles.age)
+
+    return _fade_out
+
+
+def boundary(
+    rect: Rect, inside: bool = True, callback: Optional[ArrayCallback] = None
+) -> ArrayForce:
+    """
+    Kill particles that fall outside or inside the specified bounding Rect
+    """
+
+    def _oob(particles: ParticleArray, _) -> None:
+        out = _inside(particles.pos, rect)
+        if inside:
+            out = ~out
+        _kill(particles, out, callback)
+
+    return _oob
+
+
+def lifetime(max_age: float, callback: Optional[ArrayCallback] = None) -> ArrayForce:
+    """
+    Kills particles at a specified age
+    """
+
+    def _lifetime(particles: ParticleArray, _) -> None:
+        _kill(particles, particles.age >= max_age, callback)
+
+    return _lifetime
+
+
+def _inside(pos: np.ndarray, rect: Rect) -> np.ndarray:
+    x, y = pos.T
+    return (x >= rect.left) & (x < rect.right) & (y >= rect.top) & (y < rect.bottom)
+
+
+def _kill(
+    particles: ParticleArray, which: np.ndarray, callback: Optional[ArrayCallback]
+) -> None:
+    which &= ~particles.killed
+    if not which.any():
+        return
+    if callable(callback):
+        callback(particles, np.flatnonzero(which))
+    particles.kill(which)
@@ -1,3 +1,4 @@
+from functools import cached_property
 from typing import Optional
 
 from pygame import Rect
@@ -17,10 +18,36 @@ class Screen(EventSource, State):
         self.enter = Event()
         self.exit = Event()
         self.rect = Rect(0, 0, config.WIDTH, config.HEIGHT)
-        self.surface = Surface(self.rect.size).convert_alpha()
-
-    def render(self, surface: Surface) -> None:
+        self.invalidated = True
+
+    @cached_property
+    def surface(self) -> Surface:
+        """
+        The screen's own surface, made the first time a screen draws into it
+        """
+
+        return Surface(self.rect.size).convert_alpha()
+
+    def invalidate(self) -> None:
+        """
+        Make the next render copy the whole screen, eg. because the surface it is
+        rendered to no longer holds the last frame
+        """
+
+        self.invalidated = True
+
+    def render(self, surface: Surface) -> Optional[list[Rect]]:
+        """
+        Copy the screen onto the surface if it was invalidated, as nothing else
+        changes it.
+        Returns the changed rects of the surface, or None if all of it changed.
+        """
+
+        if not self.invalidated:
+            return []
+        self.invalidated = False
         surface.blit(self.surface, self.rect.topleft)
+        return None
 
     def update(self, _: float) -> None:
         pass
@@ -38,6 +65,35 @@ class Screen(EventSource, State):
         pass
 
 
+class WorldScreen(Screen):
+    """
+    A screen which draws the world straight onto the surface, with an overlay.
+    Overlays return the rects they drew to, which are redrawn from the world next
+    frame.
+    """
+
+    def __init__(self, world) -> None:
+        super().__init__()
+        self.world = world
+        # regions drawn over the world last frame
+        self.overlay: list[Rect] = []
+
+    def invalidate(self) -> None:
+        self.world.invalidate()
+
+    def render(self, surface: Surface) -> Optional[list[Rect]]:
+        for rect in self.overlay:
+            self.world.invalidate(rect)
+        rects = self.world.render(surface)
+        self.overlay = self.render_overlay(surface)
+        if rects is None:
+            return None
+        return rects + self.overlay
+
+    def render_overlay(self, surface: Surface) -> list[Rect]:
+        return []
+
+
 class ScreenManager(StateMachine):
     def set_state(
         self,
@@ -65,11 +121,22 @@ class ScreenManager(StateMachine):
 
         return state_setter
 
-    def render(self, surface: Surface) -> None:
+    def render(self, surface: Surface) -> Optional[list[Rect]]:
+        """
+        Render the current screen, or transition.
+        Returns the changed rects of the surface, or None if all of it changed.
+        """
+
         if self.transition:
+            self._presented = None
             self.transition.render(surface)
-        else:
-            self.current_state.render(surface)
+            return None
+
+        if self.current_state is not getattr(self, "_presented", None):
+            self._presented = self.current_state
+            self.current_state.invalidate()
+
+        return self.current_state.render(surface)
 
     def update(self, dt: float) -> None:
         if self.transition:
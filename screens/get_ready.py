@@ -5,17 +5,17 @@ from pygame import Surface
 from pygame.math import Vector2
 
 from animation import Timeline
+from assets import assets
 from config import HEIGHT
 from config import WIDTH
-from screens.base import Screen
+from screens.base import WorldScreen
 from world import World
 
 
-class GetReady(Screen):
+class GetReady(WorldScreen):
     def __init__(self, world: World) -> None:
-        super().__init__()
+        super().__init__(world)
 
-        self.world = world
         self.timer = 0
         self.max_time = 3
         self.bar_pos = Timeline(
@@ -32,8 +32,8 @@ class GetReady(Screen):
         )
 
         self.get_ready = [
-            pygame.image.load("images/get_ready_player_1.png"),
-            pygame.image.load("images/get_ready_player_2.png"),
+            assets.image("images/get_ready_player_1.png"),
+            assets.image("images/get_ready_player_2.png"),
         ]
         image_width, image_height = self.get_ready[0].get_size()
         self.text_pos = Timeline(
@@ -46,18 +46,18 @@ class GetReady(Screen):
     def enter(self, *_) -> None:
         self.elapsed = 0
 
-    def render(self, surface: Surface) -> None:
-        self.world.render(self.surface)
-        pygame.draw.rect(
-            self.surface,
-            Color(255, 0, 255),
-            Rect(self.bar_pos.at(self.timer), self.bar_size.at(self.timer)),
-        )
-        self.surface.blit(
-            self.get_ready[self.world.current_player],
-            self.text_pos.at(self.timer),
-        )
-        super().render(surface)
+    def render_overlay(self, surface: Surface) -> list[Rect]:
+        return [
+            pygame.draw.rect(
+                surface,
+                Color(255, 0, 255),
+                Rect(self.bar_pos.at(self.timer), self.bar_size.at(self.timer)),
+            ),
+            surface.blit(
+                self.get_ready[self.world.current_player],
+                self.text_pos.at(self.timer),
+            ),
+        ]
 
     def update(self, dt: float) -> None:
         self.world.update(dt)
@@ -1,9 +1,9 @@
 import math
 
-import pygame
 from pygame import Rect
 from pygame.math import Vector2
 
+from assets import assets
 from config import HEIGHT
 from config import WIDTH
 from event import Event
@@ -12,22 +12,24 @@ from particle import collide_mask
 from particle import Emitter
 from particle import gravity
 from particle import Particle
+from particle import pool
 from particle import spin
-from screens.base import Screen
+from screens.base import WorldScreen
+from sprite_cache import sprites
 from world import World
 
 
-class Throw(Screen):
+class Throw(WorldScreen):
     def __init__(self, world: World) -> None:
-        super().__init__()
+        super().__init__(world)
 
         self.hit_gorilla = Event()
-        self.world = world
         self.banana_emitter = Emitter(max_particles=1)
         self.banana_emitter.add_stream(self.banana_factory())
-        self.banana_img = pygame.image.load("images/banana.png").convert_alpha()
-        self.hit_sound = pygame.mixer.Sound("sounds/hit.wav")
-        self.throw_sound = pygame.mixer.Sound("sounds/throw.wav")
+        self.banana_img = assets.image("images/banana.png")
+        sprites.prerotate(self.banana_img)
+        self.hit_sound = assets.sound("sounds/hit.wav")
+        self.throw_sound = assets.sound("sounds/throw.wav")
 
         self.on_enter(self.launch_banana)
         self.on_exit(self.reset)
@@ -45,7 +47,7 @@ class Throw(Screen):
     def banana_factory(self):
         while True:
             yield [
-                Particle(
+                pool.acquire(
                     velocity=Vector2(
                         self.world.power * math.cos(self.world.angle),
                         -1 * self.world.power * math.sin(self.world.angle),
@@ -58,8 +60,16 @@ class Throw(Screen):
                             Rect(0, -HEIGHT, WIDTH, HEIGHT * 2),
                             callback=self.out_of_bounds,
                         ),
-                        collide_mask(self.world.skyline, callback=self.hit_skyline),
-                        collide_mask(self.opponent, callback=self.hit_opponent),
+                        collide_mask(
+                            self.world.skyline,
+                            callback=self.hit_skyline,
+                            index=self.world.colliders,
+                        ),
+                        collide_mask(
+                            self.opponent,
+                            callback=self.hit_opponent,
+                            index=self.world.colliders,
+                        ),
                         gravity(),
                         spin(5),
                     ),
@@ -71,7 +81,7 @@ class Throw(Screen):
         self.exit()
 
     def hit_skyline(self, particle: Particle) -> None:
-        self.world.add_explosion(particle.pos)
+        self.world.add_explosion(particle.pos, particle.velocity.length())
         self.hit_sound.play()
         self.exit()
 
@@ -80,10 +90,6 @@ class Throw(Screen):
         self.hit_sound.play()
         self.exit()
 
-    def render(self, surface) -> None:
-        self.world.render(self.surface)
-        super().render(surface)
-
     def update(self, dt) -> None:
         self.world.update(dt)
 
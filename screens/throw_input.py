@@ -4,18 +4,19 @@ import pygame
 from pygame import Color
 from pygame import Rect
 
+from assets import assets
 from config import HEIGHT
 from config import WIDTH
 from gorilla import Gorilla
-from screens.base import Screen
+from screens.base import WorldScreen
 from util import rotate
 
 
-class ThrowInput(Screen):
+class ThrowInput(WorldScreen):
     RETICLE_WIDTH = 32
 
     def __init__(self, world) -> None:
-        super().__init__()
+        super().__init__(world)
 
         self.change_per_second = 100
         self.direction = 1
@@ -24,15 +25,16 @@ class ThrowInput(Screen):
         self.min_power = 10
         self.max_power = 200
         self.pulse_power = False
-        self.reticle = pygame.image.load("images/reticle.png")
-        self.powerbar = pygame.image.load("images/powerbar.png")
+        self.reticle = assets.image("images/reticle.png")
+        self.powerbar = assets.image("images/powerbar.png")
         self.font = pygame.font.Font(None, 24)
         self.text = ""
         self.text_surface = None
-        self.world = world
 
-    def render(self, surface) -> None:
-        self.world.render(self.surface)
+        self.on_enter(self.start_turn)
+
+    def render_overlay(self, surface) -> list[Rect]:
+        overlay = []
 
         gorilla = self.world.gorillas[self.world.current_player]
         angle = int(self.angle_input * (180 / math.pi))
@@ -40,10 +42,12 @@ class ThrowInput(Screen):
             angle = 180 - angle
         power = int(self.power_input)
 
-        pygame.draw.rect(
-            self.surface,
-            Color(0, 0, 0),
-            Rect((0, 0), (WIDTH, 16)),
+        overlay.append(
+            pygame.draw.rect(
+                surface,
+                Color(0, 0, 0),
+                Rect((0, 0), (WIDTH, 16)),
+            )
         )
         text = f"Angle: {str(angle)}, Power: {str(power)}"
         if text != self.text:
@@ -53,7 +57,7 @@ class ThrowInput(Screen):
                 True,
                 Color(255, 255, 255),
             )
-        self.surface.blit(self.text_surface, (0, 0))
+        overlay.append(surface.blit(self.text_surface, (0, 0)))
 
         angle_x = math.cos(self.angle_input)
         angle_y = math.sin(self.angle_input)
@@ -62,7 +66,7 @@ class ThrowInput(Screen):
             gorilla.pos.x + angle_x * Gorilla.WIDTH - self.RETICLE_WIDTH / 2,
             gorilla.pos.y - angle_y * Gorilla.WIDTH - self.RETICLE_WIDTH / 2,
         )
-        self.surface.blit(self.reticle, reticle_pos)
+        overlay.append(surface.blit(self.reticle, reticle_pos))
 
         if self.pulse_power:
             half_width = Gorilla.WIDTH / 2
@@ -76,15 +80,32 @@ class ThrowInput(Screen):
                 gorilla.rect.center,
                 (powerbar_length / 2 + 16, 0),
             )
-            self.surface.blit(
-                powerbar,
-                rect.topleft,
+            overlay.append(
+                surface.blit(
+                    powerbar,
+                    rect.topleft,
+                )
             )
 
-        super().render(surface)
+        return overlay
+
+    def start_turn(self) -> None:
+        if self.world.computer:
+            self.pulse_power = False
+            self.world.computer.plan(self.world)
 
     def update(self, dt) -> None:
         self.world.update(dt)
+        if self.world.computer:
+            if not self.world.computer.thinking:
+                # the computer took over part way through the turn
+                self.start_turn()
+            shot = self.world.computer.update()
+            if shot:
+                self.angle_input, self.power_input = shot
+                self.exit(*shot)
+            return
+
         if self.pulse_power:
             self.power_input += self.change_per_second * dt * self.direction
             if self.power_input < self.min_power:
@@ -103,12 +124,18 @@ class ThrowInput(Screen):
         self.set_angle_from_mouse_pos(pygame.mouse.get_pos())
 
     def on_mouse_move(self, pos, rel, buttons):
+        if self.world.computer:
+            return
         self.set_angle_from_mouse_pos(pos)
 
     def on_mouse_down(self, pos, button):
+        if self.world.computer:
+            return
         self.pulse_power = True
         self.power_input = self.min_power
 
     def on_mouse_up(self, pos, button):
+        if self.world.computer or not self.pulse_power:
+            return
         self.pulse_power = False
         self.exit(self.angle_input, self.power_input)
@@ -0,0 +1,416 @@
+import math
+from enum import Enum
+from functools import lru_cache
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+
+import numpy as np
+import pygame
+from pygame import Rect
+from pygame import Surface
+from pygame.mask import Mask
+from pygame.math import Vector2
+
+from config import HEIGHT
+from config import SPEED_FUDGE
+from config import TICK_RATE
+from config import WIDTH
+from sprite_cache import sprites
+
+
+Point = tuple[float, float]
+
+# banana properties, as thrown by screens.throw.Throw
+BANANA_MASS = 2
+BANANA_DRAG = 0.3
+BANANA_SPIN = 5
+GRAVITY = 9.8
+
+
+class Outcome(Enum):
+    HIT_OPPONENT = 1
+    HIT_SKYLINE = 2
+    OUT_OF_BOUNDS = 3
+    TIMED_OUT = 4
+
+
+class Shot(NamedTuple):
+    angle: float
+    power: float
+    player: int
+
+
+class ShotResult(NamedTuple):
+    shot: Shot
+    outcome: Outcome
+    point: Point
+    flight_time: float
+    miss_distance: float
+    trajectory: list[Point]
+
+
+class Target(NamedTuple):
+    pos: Vector2
+    rect: Rect
+    mask: Mask
+
+
+class Arena:
+    """
+    A snapshot of everything that affects a thrown banana: the skyline mask, the
+    gorillas and the wind.
+    Can be taken from a World, or built directly from masks for offline use.
+    """
+
+    def __init__(
+        self,
+        skyline_mask: Mask,
+        gorillas: Iterable[Target],
+        wind_speed: float = 0,
+        bounds: Optional[Rect] = None,
+    ) -> None:
+        # copied, so later craters don't change what has been simulated
+        self.skyline_mask = skyline_mask.copy()
+        self.gorillas = [Target(Vector2(g.pos), Rect(g.rect), g.mask) for g in gorillas]
+        self.wind_speed = wind_speed
+        self.bounds = bounds or Rect(0, -HEIGHT, WIDTH, HEIGHT * 2)
+        skyline = skyline_mask.get_bounding_rects()
+        self.skyline_top = min((rect.top for rect in skyline), default=HEIGHT)
+
+    @classmethod
+    def from_world(cls, world) -> "Arena":
+        return cls(
+            world.skyline.mask,
+            world.gorillas,
+            world.wind.speed * world.wind.direction,
+        )
+
+
+@lru_cache(maxsize=None)
+def banana() -> Surface:
+    surface = pygame.image.load("images/banana.png")
+    sprites.prerotate(surface)
+    return surface
+
+
+def simulate_shot(
+    arena: Arena,
+    shot: Shot,
+    dt: float = 1.0 / TICK_RATE,
+    max_time: float = 30.0,
+    record: bool = True,
+) -> ShotResult:
+    """
+    Fly a single banana through the arena, stepping the same forces as a thrown
+    banana particle, in the same order
+    """
+
+    image = banana()
+    thrower = arena.gorillas[shot.player]
+    opponent = arena.gorillas[(shot.player + 1) % 2]
+    bounds = arena.bounds
+    skyline_mask = arena.skyline_mask
+    skyline_top = arena.skyline_top
+    wind = arena.wind_speed * SPEED_FUDGE * dt
+    epsilon = 0.00001
+    mass = max(BANANA_MASS, epsilon)
+    fall = GRAVITY * dt * SPEED_FUDGE
+    move = dt * SPEED_FUDGE
+    target_x, target_y = opponent.pos
+
+    x, y = thrower.pos
+    vx = shot.power * math.cos(shot.angle)
+    vy = -shot.power * math.sin(shot.angle)
+    angle = 0
+    sprite = sprites.rotozoom(image, angle, 1)
+    width, height = sprite.get_size()
+    miss_distance = math.hypot(x - target_x, y - target_y)
+    trajectory = [(x, y)] if record else []
+    outcome = Outcome.TIMED_OUT
+
+    steps = round(max_time / dt)
+    for step in range(steps):
+        # wind.drag
+        rvx = vx * dt - wind
+        rvy = vy * dt
+        rmag = rvx * rvx + rvy * rvy
+        if rmag > epsilon:
+            drag = BANANA_DRAG * rmag + BANANA_DRAG * BANANA_DRAG * rmag * rmag
+            force = drag / (rmag * mass)
+            vx -= rvx * force
+            vy -= rvy * force
+
+        # boundary
+        if not bounds.collidepoint(x, y):
+            outcome = Outcome.OUT_OF_BOUNDS
+            break
+
+        rect = Rect(x - width / 2, y - height / 2, width, height)
+
+        # collide_mask(skyline)
+        if rect.bottom > skyline_top and skyline_mask.overlap(
+            sprites.mask(sprite), rect.topleft
+        ):
+            outcome = Outcome.HIT_SKYLINE
+            break
+
+        # collide_mask(opponent)
+        if opponent.rect.colliderect(rect) and opponent.mask.overlap(
+            sprites.mask(sprite),
+            (rect.left - opponent.rect.left, rect.top - opponent.rect.top),
+        ):
+            outcome = Outcome.HIT_OPPONENT
+            break
+
+        # gravity
+        vy += fall
+
+        # spin
+        angle += BANANA_SPIN
+        sprite = sprites.rotozoom(image, angle, 1)
+        width, height = sprite.get_size()
+
+        x += vx * move
+        y += vy * move
+        miss_distance = min(miss_distance, math.hypot(x - target_x, y - target_y))
+        if record:
+            trajectory.append((x, y))
+
+    else:
+        step = steps
+
+    return ShotResult(
+        shot,
+        outcome,
+        (x, y),
+        step * dt,
+        miss_distance,
+        trajectory,
+    )
+
+
+def simulate_shots(
+    arena: Arena,
+    shots: Iterable[Shot],
+    dt: float = 1.0 / TICK_RATE,
+    max_time: float = 30.0,
+    record: bool = True,
+) -> list[ShotResult]:
+    """
+    Evaluate a batch of shots without a display, sounds or per-frame surfaces
+    """
+
+    return [simulate_shot(arena, shot, dt, max_time, record) for shot in shots]
+
+
+class HitMap(NamedTuple):
+    """
+    Outcomes of a grid of shots, indexed by [angle, power]
+    """
+
+    angles: np.ndarray
+    powers: np.ndarray
+    player: int
+    outcome: np.ndarray
+    point: np.ndarray
+    flight_time: np.ndarray
+
+    def hits(self) -> np.ndarray:
+        return self.outcome == Outcome.HIT_OPPONENT.value
+
+
+def mask_to_array(mask: Mask) -> np.ndarray:
+    """
+    Export a mask as a boolean occupancy array indexed by [x, y]
+    """
+
+    surface = mask.to_surface(setcolor=(255, 255, 255), unsetcolor=(0, 0, 0))
+    return pygame.surfarray.array_red(surface) > 0
+
+
+def _integral(occupancy: np.ndarray) -> np.ndarray:
+    integral = np.zeros((occupancy.shape[0] + 1, occupancy.shape[1] + 1), np.int32)
+    integral[1:, 1:] = occupancy.cumsum(0).cumsum(1)
+    return integral
+
+
+def _occupied(
+    integral: np.ndarray,
+    left: np.ndarray,
+    top: np.ndarray,
+    right: np.ndarray,
+    bottom: np.ndarray,
+) -> np.ndarray:
+    """
+    Check if any cell of an occupancy array lies within each of the rects
+    """
+
+    width, height = integral.shape[0] - 1, integral.shape[1] - 1
+    stride = height + 1
+    left = np.clip(left, 0, width) * stride
+    right = np.clip(right, 0, width) * stride
+    top = np.clip(top, 0, height)
+    bottom = np.clip(bottom, 0, height)
+    cells = integral.ravel()
+    total = cells[right + bottom] - cells[left + bottom] - cells[right + top]
+    return total + cells[left + top] > 0
+
+
+def simulate_grid(
+    arena: Arena,
+    angles: Iterable[float],
+    powers: Iterable[float],
+    player: int,
+    dt: float = 1.0 / TICK_RATE,
+    max_time: float = 30.0,
+) -> HitMap:
+    """
+    Fly a banana for every combination of angle and power at once, as NumPy arrays.
+    Every banana spins in step, so all of them share one rotated sprite per step.
+    A summed-area table of the skyline mask, and the opponent's rect, pick out the
+    bananas that might touch something solid, and only those get an exact mask test.
+    """
+
+    image = banana()
+    thrower = arena.gorillas[player]
+    opponent = arena.gorillas[(player + 1) % 2]
+    bounds = arena.bounds
+    skyline_mask = arena.skyline_mask
+    skyline = _integral(mask_to_array(skyline_mask))
+    opponent_rect = opponent.rect
+    lowest_top = min(arena.skyline_top, opponent_rect.top)
+    wind = arena.wind_speed * SPEED_FUDGE * dt
+    epsilon = 0.00001
+    mass = max(BANANA_MASS, epsilon)
+    fall = GRAVITY * dt * SPEED_FUDGE
+    move = dt * SPEED_FUDGE
+
+    angles = np.asarray(angles, dtype=float)
+    powers = np.asarray(powers, dtype=float)
+    angle_grid, power_grid = np.meshgrid(angles, powers, indexing="ij")
+    shape = angle_grid.shape
+    count = angle_grid.size
+
+    outcome = np.full(count, Outcome.TIMED_OUT.value, dtype=np.int8)
+    point = np.empty((count, 2))
+    flight_time = np.full(count, max_time)
+
+    index = np.arange(count)
+    x = np.full(count, float(thrower.pos.x))
+    y = np.full(count, float(thrower.pos.y))
+    vx = (power_grid * np.cos(angle_grid)).ravel()
+    vy = (-power_grid * np.sin(angle_grid)).ravel()
+
+    out_of_bounds = Outcome.OUT_OF_BOUNDS.value
+    hit_skyline = Outcome.HIT_SKYLINE.value
+    hit_opponent = Outcome.HIT_OPPONENT.value
+
+    steps = round(max_time / dt)
+    spin = 0
+    for step in range(steps):
+        if not len(index):
+            break
+
+        sprite = sprites.rotozoom(image, spin, 1)
+        width, height = sprite.get_size()
+        banana_mask = sprites.mask(sprite)
+        solid, *rects = banana_mask.get_bounding_rects()
+        solid = solid.unionall(rects)
+
+        # wind.drag
+        rvx = vx * dt - wind
+        rvy = vy * dt
+        rmag = rvx * rvx + rvy * rvy
+        drag = BANANA_DRAG * rmag + BANANA_DRAG * BANANA_DRAG * rmag * rmag
+        force = drag / (np.maximum(rmag, epsilon) * mass)
+        force[rmag <= epsilon] = 0
+        vx -= rvx * force
+        vy -= rvy * force
+
+        # boundary
+        done = np.zeros(len(index), dtype=np.int8)
+        px = np.trunc(x)
+        py = np.trunc(y)
+        inside = (
+            (px >= bounds.left)
+            & (px < bounds.right)
+            & (py >= bounds.top)
+            & (py < bounds.bottom)
+        )
+        done[~inside] = out_of_bounds
+
+        # only bananas low enough to reach a building or the opponent can collide
+        low = np.flatnonzero(inside & (y + height / 2 + 1 > lowest_top))
+        left = np.trunc(x[low] - width / 2).astype(int)
+        top = np.trunc(y[low] - height / 2).astype(int)
+        right = left + width
+        bottom = top + height
+
+        # collide_mask(skyline)
+        near = np.flatnonzero(
+            _occupied(
+                skyline,
+                left + solid.left,
+                top + solid.top,
+                left + solid.right,
+                top + solid.bottom,
+            )
+        )
+        for i, offset in zip(
+            low[near].tolist(), zip(left[near].tolist(), top[near].tolist())
+        ):
+            if skyline_mask.overlap(banana_mask, offset):
+                done[i] = hit_skyline
+
+        # collide_mask(opponent)
+        near = (
+            (done[low] == 0)
+            & (right > opponent_rect.left)
+            & (left < opponent_rect.right)
+            & (bottom > opponent_rect.top)
+            & (top < opponent_rect.bottom)
+        )
+        near = np.flatnonzero(near)
+        for i, offset in zip(
+            low[near].tolist(),
+            zip(
+                (left[near] - opponent_rect.left).tolist(),
+                (top[near] - opponent_rect.top).tolist(),
+            ),
+        ):
+            if opponent.mask.overlap(banana_mask, offset):
+                done[i] = hit_opponent
+
+        finished = done != 0
+        if finished.any():
+            ended = index[finished]
+            outcome[ended] = done[finished]
+            point[ended, 0] = x[finished]
+            point[ended, 1] = y[finished]
+            flight_time[ended] = step * dt
+
+            flying = ~finished
+            index = index[flying]
+            x, y, vx, vy = x[flying], y[flying], vx[flying], vy[flying]
+
+        # gravity
+        vy += fall
+
+        # spin
+        spin += BANANA_SPIN
+
+        x += vx * move
+        y += vy * move
+
+    point[index, 0] = x
+    point[index, 1] = y
+
+    return HitMap(
+        angles,
+        powers,
+        player,
+        outcome.reshape(shape),
+        point.reshape((*shape, 2)),
+        flight_time.reshape(shape),
+    )
@@ -1,26 +1,45 @@
 import math
 import random
+from bisect import bisect_right
 from functools import cached_property
+from typing import Hashable
 from typing import Iterable
+from typing import Optional
+from typing import Sequence
 
+import numpy as np
+import pygame
 from pygame import Color
 from pygame import draw
 from pygame import Rect
 from pygame import Surface
-from pygame.constants import HWSURFACE
 from pygame.constants import SRCALPHA
 
 from animation import Timeline
+from config import SKY_CACHE_BYTES
+from event import Event
+from event import EventSource
 from gradient import Gradient
 from particle import boundary
 from particle import drag
+from particle import Emitter
+from particle import Force
 from particle import Particle
+from particle import pool
+from sprite_cache import SpriteCache
+from sprite_cache import sprites
 from wind import Wind
 
 
-class Sky:
+class Sky(EventSource):
     """
-    A gradient sky background with colours determined by the specified time
+    A gradient sky background with colours determined by the specified time.
+    Skies are cached per time step, within a memory budget, and share one field of
+    stars.
+    In cycle mode, time advances with each update, and the sky is drawn by blending
+    the two keyframe gradients either side of it, with the stars faded on top. Each
+    blend is rendered a band at a time over the frames before it is shown, and
+    cached opaque, so changing to it is a single blit.
     """
 
     # hours after midnight
@@ -57,9 +76,33 @@ class Sky:
         (SUNRISE_SWITCH, 0.0),
     )
 
-    def __init__(self, width: int, height: int, time: float = NOON) -> None:
+    # the time of day is rendered to the nearest step
+    STEPS_PER_HOUR = 10
+    # distinct alpha levels used when blending in cycle mode
+    BLEND_LEVELS = 64
+    # in cycle mode, the sky is rendered this many frames before it is shown, a
+    # band of rows per frame
+    PREFETCH_FRAMES = 16
+    PREFETCH_BANDS = 8
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        time: float = NOON,
+        cycle: bool = False,
+        day_length: float = 240,
+    ) -> None:
         self.width = width
         self.height = height
+        self.cycle = cycle
+        self.day_length = day_length
+        self.cache = SpriteCache(max_bytes=SKY_CACHE_BYTES)
+        self.pending: list[int] = []
+        # the blended sky being rendered ahead, and the next band to render
+        self.upcoming: Optional[tuple[Hashable, Surface, int]] = None
+        self.changed = Event()
+        self.appearance: Hashable = None
         self.time = time
 
     @property
@@ -69,91 +112,305 @@ class Sky:
     @time.setter
     def time(self, value):
         self._time = value % 24
-        try:
-            del self.surface
-        except AttributeError:
-            pass
+        appearance = self.blend() if self.cycle else self.step
+        if appearance != self.appearance:
+            self.appearance = appearance
+            self.changed()
+
+    @property
+    def step(self) -> int:
+        return self.time_to_step(self.time)
+
+    @property
+    def surface(self) -> Surface:
+        if self.cycle:
+            return self.at_blend(self.appearance)
+        return self.at_step(self.step)
 
     @cached_property
-    def surface(self):
-        surface = self.gradient.at(self.time).get_surface((self.width, self.height))
-        star_alpha = self.star_alpha.at(self.time)
+    def stars(self) -> "StarField":
+        return StarField(self.width, self.height)
+
+    def time_to_step(self, time: float) -> int:
+        steps = 24 * self.STEPS_PER_HOUR
+        return round(time * self.STEPS_PER_HOUR) % steps
+
+    def at_step(self, step: int) -> Surface:
+        return self.cache.get(
+            step, lambda: self.render_time(step / self.STEPS_PER_HOUR)
+        )
+
+    def at_blend(self, appearance: tuple[int, int, int]) -> Surface:
+        def render() -> Surface:
+            surface = Surface((self.width, self.height)).convert()
+            self.render_blend(surface, *appearance)
+            return surface
+
+        return self.cache.get(appearance, render)
+
+    def blend(self, time: Optional[float] = None) -> tuple[int, int, int]:
+        """
+        Get the keyframe gradient to start from, and the levels of the next
+        gradient and the stars to blend over it, at the current time or the
+        specified one
+        """
+
+        time = self.time if time is None else time % 24
+        timestamps = self.gradient.timestamps
+        end = min(max(bisect_right(timestamps, time), 1), len(timestamps) - 1)
+        start = end - 1
+        progress = (time - timestamps[start]) / (timestamps[end] - timestamps[start])
+        progress = min(max(progress, 0.0), 1.0)
+        gradients = self.gradient.states
+        if (tuple(gradients[start].start), tuple(gradients[start].end)) == (
+            tuple(gradients[end].start),
+            tuple(gradients[end].end),
+        ):
+            progress = 0.0
+        return (
+            start,
+            round(progress * self.BLEND_LEVELS),
+            round(self.star_alpha.at(time) * self.BLEND_LEVELS),
+        )
+
+    def prefetch(self, time: float) -> None:
+        """
+        Queue the sky at the specified time to be rendered by a later update
+        """
+
+        if not self.cycle:
+            self.pending.append(self.time_to_step(time))
+
+    def update(self, dt: float) -> None:
+        """
+        Advance the time and render a band of the sky a few frames ahead in cycle
+        mode, otherwise render at most one prefetched sky, so the work is spread
+        over frames
+        """
+
+        if self.cycle:
+            hours = dt * 24 / self.day_length
+            self.time += hours
+            self.render_ahead(self.time + hours * self.PREFETCH_FRAMES)
+
+        elif self.pending:
+            self.at_step(self.pending.pop(0))
+
+    def render_ahead(self, time: float) -> None:
+        """
+        Render the next band of the blended sky at a later time, and cache it once
+        every band is done, so changing to it is a single blit
+        """
+
+        if self.upcoming is None:
+            appearance = self.blend(time)
+            if appearance == self.appearance or appearance in self.cache:
+                return
+            surface = Surface((self.width, self.height)).convert()
+            self.upcoming = (appearance, surface, 0)
+
+        appearance, surface, band = self.upcoming
+        band_height = -(-self.height // self.PREFETCH_BANDS)
+        surface.set_clip(Rect(0, band * band_height, self.width, band_height))
+        self.render_blend(surface, *appearance)
+        surface.set_clip(None)
+        band += 1
+        if band < self.PREFETCH_BANDS:
+            self.upcoming = (appearance, surface, band)
+        else:
+            self.cache.get(appearance, lambda: surface)
+            self.upcoming = None
+
+    def render(self, surface: Surface) -> list[Rect]:
+        return [surface.blit(self.surface, (0, 0))]
+
+    def render_blend(
+        self, surface: Surface, start: int, level: int, star_level: int
+    ) -> None:
+        size = (self.width, self.height)
+        gradients = self.gradient.states
+        surface.blit(gradients[start].get_surface(size), (0, 0))
+        if level:
+            # the gradient surface is shared, so its alpha is restored after
+            blend = gradients[start + 1].get_surface(size)
+            blend.set_alpha(level * 255 // self.BLEND_LEVELS)
+            surface.blit(blend, (0, 0))
+            blend.set_alpha(255)
+        if star_level:
+            self.stars.surface.set_alpha(star_level * 255 // self.BLEND_LEVELS)
+            surface.blit(self.stars.surface, (0, 0))
+
+    def render_time(self, time: float) -> Surface:
+        surface = self.gradient.at(time).get_surface((self.width, self.height))
+        star_alpha = self.star_alpha.at(time)
         if star_alpha > 0.0:
-            stars = StarField(self.width, self.height)
-            stars.surface.set_alpha(star_alpha * 255)
-            surface.blit(stars.surface, (0, 0))
+            surface = surface.copy()
+            self.stars.surface.set_alpha(star_alpha * 255)
+            surface.blit(self.stars.surface, (0, 0))
 
         return surface
 
 
 class StarField:
     """
-    A randomly generated field of stars
+    A randomly generated field of stars, the same for the same seed
     """
 
-    def __init__(self, width: int, height: int) -> None:
+    def __init__(self, width: int, height: int, seed: Optional[int] = None) -> None:
         self.width = width
         self.height = height
         num_stars = int(width * height * 0.0005)
-        self.surface = Surface((width, height)).convert_alpha()
-
-        for _ in range(num_stars):
-            pos = (random.randint(0, width), random.randint(0, height))
-            brightness = random.randint(1, 4)
-            if brightness < 4:
-                self.surface.set_at(pos, Color(255, 255, 255, 63 + brightness * 64))
-            else:
-                draw.circle(
-                    self.surface,
-                    Color(255, 255, 255),
-                    pos,
-                    1,
-                    width=0,
-                )
+        rng = np.random.default_rng(seed)
+        x = rng.integers(0, width, num_stars, endpoint=True)
+        y = rng.integers(0, height, num_stars, endpoint=True)
+        brightness = rng.integers(1, 4, num_stars, endpoint=True)
+
+        # the brightest are circles of radius 1, which cover 2x2 pixels
+        dim = brightness < 4
+        bright = ~dim
+        offsets = ((0, 0), (-1, 0), (0, -1), (-1, -1))
+        x = np.concatenate([x[dim], *(x[bright] + dx for dx, _ in offsets)])
+        y = np.concatenate([y[dim], *(y[bright] + dy for _, dy in offsets)])
+        alpha = np.concatenate(
+            [
+                63 + brightness[dim] * 64,
+                np.full(len(offsets) * np.count_nonzero(bright), 255),
+            ]
+        )
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+
+        # new surfaces are transparent, so only the stars themselves are written
+        self.surface = Surface((width, height), SRCALPHA)
+        x, y = x[inside], y[inside]
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        pixels[x, y] = 255
+        del pixels
+        pixels = pygame.surfarray.pixels_alpha(self.surface)
+        pixels[x, y] = alpha[inside]
+        del pixels
 
 
 class Cloud:
     """
-    Procedurally generated cloud
+    Procedurally generated cloud, the same for the same seed
     """
 
-    def __init__(self, width: int, height: int) -> None:
+    def __init__(self, width: int, height: int, seed: Optional[int] = None) -> None:
         self.width = width
         self.height = height
+        # drawn directly, as setting up a batch costs more than a single cloud
+        rng = random if seed is None else random.Random(seed)
         half_width = width / 2
-        margin = int(max(1, width / 10))
-        self.surface = Surface(
-            (width, height),
-            flags=HWSURFACE,
-        ).convert_alpha()
-
-        for _ in range(random.randint(20, 40)):
-            x = random.randrange(margin, width - margin)
+        margin = max(1, width // 10)
+        self.surface = Surface((width, height), SRCALPHA)
+        colour = Color(255, 255, 255)
+        y = height - 2
+        for _ in range(rng.randint(20, 40)):
+            x = rng.randrange(margin, width - margin)
             dist_from_center = abs(half_width - x)
-            scale = random.random() + 2 * math.sin(1 / (dist_from_center + 1))
-            y = height - 2
-            r = max(1, margin * scale)
-            draw.circle(self.surface, Color(255, 255, 255), (x, y), r, width=0)
+            scale = rng.random() + 2 * math.sin(1 / (dist_from_center + 1))
+            draw.circle(self.surface, colour, (x, y), max(1, int(margin * scale)))
+
+
+def cloud_surfaces(
+    widths: Sequence[int], height: int, seed: Optional[int] = None
+) -> list[Surface]:
+    """
+    Generate a set of clouds at once, as subsurfaces of a single surface.
+    Each cloud is a row of circles along its bottom edge, bigger towards the middle.
+    """
+
+    rng = np.random.default_rng(seed)
+    num_clouds = len(widths)
+    widths = np.asarray(widths)[:, np.newaxis]
+    margins = np.maximum(1, widths // 10)
+
+    # clouds have different numbers of circles, so only the first of each row of
+    # circles is used
+    counts = rng.integers(20, 40, num_clouds, endpoint=True)
+    circles = int(counts.max())
+    x = rng.integers(margins, widths - margins, (num_clouds, circles))
+    dist_from_center = np.abs(widths / 2 - x)
+    scale = rng.random((num_clouds, circles)) + 2 * np.sin(1 / (dist_from_center + 1))
+    radius = np.maximum(1, margins * scale).astype(int)
+
+    # the clouds are laid side by side, and each is drawn through its own
+    # subsurface so circles are clipped to it
+    offsets = np.concatenate(([0], np.cumsum(widths)))
+    surface = Surface((int(offsets[-1]), height), SRCALPHA)
+    surface.fill(Color(255, 255, 255, 0))
+    colour = Color(255, 255, 255)
+    y = height - 2
+    subsurfaces = []
+    for i, count in enumerate(counts.tolist()):
+        subsurface = surface.subsurface(
+            Rect(int(offsets[i]), 0, int(widths[i, 0]), height)
+        )
+        for circle_x, circle_radius in zip(
+            x[i, :count].tolist(), radius[i, :count].tolist()
+        ):
+            draw.circle(subsurface, colour, (circle_x, y), circle_radius)
+        subsurfaces.append(subsurface)
+
+    return subsurfaces
+
+
+def cloud_forces(wind: Wind, bounds: Rect) -> tuple[Force, ...]:
+    return (
+        wind.drag,
+        boundary(bounds),
+    )
 
 
-def make_cloud_particle(wind: Wind, bounds: Rect) -> Particle:
-    cloud = Cloud(random.randrange(100, 300), 100)
-    return Particle(
-        surface=cloud.surface,
+class CloudPool:
+    """
+    A fixed set of clouds, generated once, for the cloud stream to draw from so no
+    surfaces are made as clouds come and go
+    """
+
+    HEIGHT = 100
+    MIN_WIDTH = 100
+    MAX_WIDTH = 300
+
+    def __init__(self, size: int = 16, seed: Optional[int] = None) -> None:
+        rng = random.Random(seed)
+        widths = [rng.randrange(self.MIN_WIDTH, self.MAX_WIDTH) for _ in range(size)]
+        self.sprites = cloud_surfaces(widths, self.HEIGHT, seed)
+        # particles are drawn through the shared sprite cache, so it is filled now
+        for sprite in self.sprites:
+            sprites.rotozoom(sprite, 0, 1)
+
+    def choose(self) -> Surface:
+        return random.choice(self.sprites)
+
+
+def make_cloud_particle(
+    wind: Wind,
+    bounds: Rect,
+    cloud_pool: CloudPool,
+    forces: Optional[tuple[Force, ...]] = None,
+) -> Particle:
+    return pool.acquire(
+        surface=cloud_pool.choose(),
         mass=1,
         alpha=128,
         drag_coefficient=random.uniform(0.4, 0.8),
-        forces=(
-            wind.drag,
-            boundary(bounds),
-        ),
+        forces=forces or cloud_forces(wind, bounds),
     )
 
 
-def clouds(wind: Wind, bounds: Rect) -> Iterable[Iterable[Particle]]:
+def clouds(
+    wind: Wind, bounds: Rect, emitter: Emitter, cloud_pool: CloudPool
+) -> Iterable[Iterable[Particle]]:
+    """
+    Stream clouds into the emitter from the pool, while it has room for them
+    """
+
+    forces = cloud_forces(wind, bounds)
+
     while True:
-        if random.random() < 0.95:
-            p = make_cloud_particle(wind, bounds)
+        if not emitter.full and random.random() < 0.95:
+            p = make_cloud_particle(wind, bounds, cloud_pool, forces)
             p.pos.y = random.randrange(60, int(bounds.height / 4))
             p.pos.x = bounds.left
             if wind.direction < 0:
@@ -0,0 +1,140 @@
+import math
+from collections import OrderedDict
+from typing import Callable
+from typing import Hashable
+
+import pygame
+from pygame import Color
+from pygame import Surface
+from pygame.constants import SRCALPHA
+from pygame.mask import Mask
+
+from config import SPRITE_CACHE_BYTES
+
+
+class SpriteCache:
+    """
+    A least-recently-used cache of rendered sprites, bounded by the memory they use.
+    Angles, scales and colours are quantized, so particles that look the same share
+    a single pre-rendered surface.
+    Collision masks are built once per sprite, and sprites pre-rendered with
+    prerotate are never evicted.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = SPRITE_CACHE_BYTES,
+        angle_step: float = 5,
+        scale_step: float = 1 / 32,
+        colour_step: int = 16,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.angle_step = angle_step
+        self.scale_step = scale_step
+        self.colour_step = colour_step
+        self.sprites: OrderedDict[Hashable, Surface] = OrderedDict()
+        self.pinned: dict[Hashable, Surface] = {}
+        self.masks: dict[Surface, Mask] = {}
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.sprites) + len(self.pinned)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.sprites or key in self.pinned
+
+    def get(self, key: Hashable, render: Callable[[], Surface]) -> Surface:
+        sprite = self.pinned.get(key)
+        if sprite is not None:
+            return sprite
+
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            return sprite
+
+        sprite = render()
+        self.sprites[key] = sprite
+        self.bytes += sprite.get_pitch() * sprite.get_height()
+        while self.bytes > self.max_bytes and len(self.sprites) > 1:
+            _, evicted = self.sprites.popitem(last=False)
+            self.bytes -= evicted.get_pitch() * evicted.get_height()
+            self.masks.pop(evicted, None)
+        return sprite
+
+    def mask(self, sprite: Surface) -> Mask:
+        """
+        Get the collision mask of a sprite handed out by this cache
+        """
+
+        mask = self.masks.get(sprite)
+        if mask is None:
+            mask = self.masks[sprite] = pygame.mask.from_surface(sprite)
+        return mask
+
+    def prerotate(self, surface: Surface, scale: float = 1) -> None:
+        """
+        Render every angle step of a surface, and its mask, ahead of time
+        """
+
+        scale = self.quantize_scale(scale)
+        for step in range(math.ceil(360 / self.angle_step)):
+            angle = self.quantize_angle(step * self.angle_step)
+            key = (surface, angle, scale)
+            sprite = self.sprites.pop(key, None)
+            if sprite is None:
+                sprite = pygame.transform.rotozoom(surface, angle, scale)
+            else:
+                self.bytes -= sprite.get_pitch() * sprite.get_height()
+            self.pinned[key] = sprite
+            self.mask(sprite)
+
+    def clear(self) -> None:
+        self.sprites.clear()
+        self.pinned.clear()
+        self.masks.clear()
+        self.bytes = 0
+
+    def quantize_angle(self, angle: float) -> float:
+        return (round(angle / self.angle_step) * self.angle_step) % 360
+
+    def quantize_scale(self, scale: float) -> float:
+        return round(scale / self.scale_step) * self.scale_step
+
+    def rotozoom(self, surface: Surface, angle: float, scale: float) -> Surface:
+        """
+        Get the surface rotated and scaled to the nearest angle and scale step
+        """
+
+        angle = self.quantize_angle(angle)
+        scale = self.quantize_scale(scale)
+        return self.get(
+            (surface, angle, scale),
+            lambda: pygame.transform.rotozoom(surface, angle, scale),
+        )
+
+    def circle(self, colour: Color, width: float, height: float) -> Surface:
+        """
+        Get a filled circle of the nearest colour step, on a surface of the
+        specified size
+        """
+
+        step = self.colour_step
+        colour = tuple(min(255, round(channel / step) * step) for channel in colour)
+        size = (int(width), int(height))
+        return self.get(("circle", colour, size), lambda: _circle(colour, size))
+
+
+def _circle(colour: tuple[int, int, int, int], size: tuple[int, int]) -> Surface:
+    width, height = size
+    surface = Surface(size, SRCALPHA).convert_alpha()
+    pygame.draw.circle(
+        surface,
+        colour,
+        center=(width / 2, height / 2),
+        radius=max(width, height) / 2,
+    )
+    return surface
+
+
+sprites = SpriteCache()
@@ -1,13 +1,21 @@
+import math
 import random
 from enum import Enum
+from typing import NamedTuple
 
 import pygame
 from pygame import Color
 from pygame import Rect
 from pygame import Surface
+from pygame.constants import SRCALPHA
+from pygame.mask import Mask
 
+from assets import assets
+from column_terrain import ColumnTerrain
+from config import FACADE_CACHE_BYTES
 from config import HEIGHT
 from config import WIDTH
+from sprite_cache import SpriteCache
 from util import tile
 
 
@@ -49,6 +57,7 @@ class Building(Rect):
     MIN_HEIGHT = 20
     MIN_WIDTH = 80
     MAX_WIDTH = 240
+    VARIANTS = (1, 2, 3, 4)
 
     class Material(Enum):
         BRICK = 1
@@ -60,19 +69,41 @@ class Building(Rect):
         RESIDENTIAL = 2
 
     def __init__(self, *args, material=Material.BRICK, variant=1, **kwargs):
-        self.windows = kwargs.pop("windows", None)
+        # (left, top, width, height) of each window, as fractions of the building
+        self.windows = tuple(kwargs.pop("windows", None) or ())
         super().__init__(*args, **kwargs)
         self.material = material
-        self.texture = pygame.image.load(
-            f"images/building_tex_{material.value}_{variant}.png"
-        )
+        self.variant = variant
+
+    @property
+    def texture(self) -> Surface:
+        return assets.image(self.texture_path(self.material, self.variant))
+
+    @staticmethod
+    def texture_path(material: Material, variant: int) -> str:
+        return f"images/building_tex_{material.value}_{variant}.png"
+
+    @classmethod
+    def load_textures(cls) -> None:
+        """
+        Load every texture, so buildings can be rendered off the main thread
+        """
+
+        for material in cls.Material:
+            for variant in cls.VARIANTS:
+                assets.image(cls.texture_path(material, variant))
 
     @classmethod
-    def random_list(cls, max_width: int = WIDTH) -> list["Building"]:
+    def random_list(cls, max_width: int = WIDTH, rng=random) -> list["Building"]:
+        """
+        Generate buildings to fill the width, using the random module or the
+        specified Random instance
+        """
+
         widths = []
         remaining = max_width
         while remaining > Building.MIN_WIDTH:
-            width = random.randrange(
+            width = rng.randrange(
                 Building.MIN_WIDTH, min(Building.MAX_WIDTH, remaining)
             )
             remaining -= width
@@ -96,74 +127,177 @@ class Building(Rect):
 
         x = 0
         for width in widths:
-            height = random.randrange(Building.MIN_HEIGHT, Building.MAX_HEIGHT)
+            height = rng.randrange(Building.MIN_HEIGHT, Building.MAX_HEIGHT)
             yield Building(
                 x,
                 HEIGHT - height,
                 width,
                 height,
-                material=random.choice(list(Building.Material)),
-                variant=random.choice([1, 2, 3, 4]),
+                material=rng.choice(list(Building.Material)),
+                variant=rng.choice(Building.VARIANTS),
                 windows=(
-                    Interval(random.randint(0, width // 40), random.uniform(0.6, 0.9))
-                    & Interval(
-                        random.randint(0, height // 40), random.uniform(0.6, 0.9)
-                    )
+                    Interval(rng.randint(0, width // 40), rng.uniform(0.6, 0.9))
+                    & Interval(rng.randint(0, height // 40), rng.uniform(0.6, 0.9))
                 ),
             )
             x += width
 
     def render(self, surface) -> None:
-        tile(surface, self.texture, self)
-
-        if self.windows:
-            for left, top, width, height in self.windows:
-                window = Rect(
-                    int(left * self.width) + self.left,
-                    int(top * self.height) + self.top,
-                    int(width * self.width),
-                    int(height * self.height),
-                )
-                pygame.draw.rect(
-                    surface,
-                    Color(0, 0, 0),
-                    window,
-                )
-                pygame.draw.rect(
-                    surface,
-                    Color(200, 200, 200),
-                    window,
-                    width=2,
-                )
+        surface.blit(self.facade, self.topleft)
+
+    @property
+    def facade(self) -> Surface:
+        """
+        Get the textured, windowed front of the building, from the cache if possible
+        """
+
+        windows = tuple(
+            (
+                int(left * self.width),
+                int(top * self.height),
+                int(width * self.width),
+                int(height * self.height),
+            )
+            for left, top, width, height in self.windows
+        )
+        key = ("facade", self.material, self.variant, self.size, windows)
+        return facades.get(key, lambda: self._render_facade(windows))
+
+    @property
+    def tiled_texture(self) -> Surface:
+        """
+        Get the texture tiled over a surface big enough for any building
+        """
+
+        def _tile() -> Surface:
+            tile_width, tile_height = self.texture.get_size()
+            size = (
+                math.ceil(Building.MAX_WIDTH / tile_width) * tile_width,
+                math.ceil(Building.MAX_HEIGHT / tile_height) * tile_height,
+            )
+            surface = Surface(size, SRCALPHA)
+            tile(surface, self.texture, surface.get_rect())
+            return surface
+
+        return facades.get(("texture", self.material, self.variant), _tile)
+
+    def _render_facade(self, windows: tuple[tuple[int, int, int, int], ...]) -> Surface:
+        surface = Surface(self.size, SRCALPHA)
+        # the tiled texture is a whole number of tiles, so it tiles seamlessly too
+        tile(surface, self.tiled_texture, surface.get_rect())
+        surface.blits(
+            [
+                (window_sprite((width, height)), (left, top))
+                for left, top, width, height in windows
+                if width > 0 and height > 0
+            ],
+            doreturn=False,
+        )
+        return surface
+
+
+def window_sprite(size: tuple[int, int]) -> Surface:
+    """
+    Get a window, drawn once per size
+    """
+
+    def _render() -> Surface:
+        surface = Surface(size, SRCALPHA)
+        surface.fill(Color(0, 0, 0))
+        pygame.draw.rect(surface, Color(200, 200, 200), surface.get_rect(), width=2)
+        return surface
+
+    return facades.get(("window", size), _render)
+
+
+facades = SpriteCache(max_bytes=FACADE_CACHE_BYTES)
+
+
+class SkylineLayout(NamedTuple):
+    buildings: list[Building]
+    columns: ColumnTerrain
+    mask: Mask
+    # the rendered buildings, as RGBA rows
+    pixels: bytes
 
 
 class Skyline:
+    """
+    The buildings, composited once onto a persistent surface.
+    Explosions erase craters from the mask and clear the same pixels on the surface,
+    so rendering is a single blit. The same craters are erased from the column
+    spans, which describe the same terrain far more compactly.
+    Layouts can be generated on another thread, one at a time, and applied later
+    on the main thread. There are no buildings until the first one is applied.
+    """
+
     def __init__(self):
         self.buildings = []
+        self.columns = None
         self.mask = None
         self.rect = Rect((0, 0), (WIDTH, HEIGHT))
         self.surface = None
         self.num_buildings = 10
-        self.generate_buildings()
+        # changes whenever the terrain does, so derived data can be cached
+        self.version = 0
+        Building.load_textures()
 
     def generate_buildings(self):
-        self.buildings = list(Building.random_list(WIDTH))
-        self.surface = Surface((WIDTH, HEIGHT)).convert_alpha()
-        for building in self.buildings:
-            building.render(self.surface)
-        self.mask = pygame.mask.from_surface(self.surface)
+        self.apply(self.layout())
 
-    def render(self, surface) -> None:
-        surface.blit(
-            self.mask.to_surface(
-                unsetcolor=None,
-                setsurface=self.surface,
-            ),
-            (0, 0),
+    @staticmethod
+    def layout(rng=random) -> SkylineLayout:
+        """
+        Generate and render buildings, and their mask, using the random module or
+        the specified Random instance.
+        Only plain surfaces are used, and the pixels are handed back as a buffer.
+        """
+
+        buildings = list(Building.random_list(WIDTH, rng))
+        surface = Surface((WIDTH, HEIGHT), SRCALPHA)
+        for building in buildings:
+            building.render(surface)
+        # facades are opaque, so the terrain is just the buildings' rects
+        columns = ColumnTerrain.from_rects((WIDTH, HEIGHT), buildings)
+        return SkylineLayout(
+            buildings,
+            columns,
+            columns.to_mask(),
+            pygame.image.tostring(surface, "RGBA"),
         )
 
-    def destroy(self, other):
-        self.mask.erase(other.mask, (int(other.rect.left), int(other.rect.top)))
+    def apply(self, layout: SkylineLayout) -> None:
+        """
+        Replace the buildings with a generated layout
+        """
+
+        surface = pygame.image.frombuffer(layout.pixels, (WIDTH, HEIGHT), "RGBA")
+        self.surface = surface.convert_alpha()
+        self.buildings = layout.buildings
+        self.columns = layout.columns
+        self.mask = layout.mask
+        self.version += 1
+
+    def render(self, surface) -> list[Rect]:
+        return [surface.blit(self.surface, (0, 0))]
+
+    def destroy(self, *others):
+        """
+        Erase any number of craters, each with a mask and column spans, in one batch
+        """
+
+        self.version += 1
+        for other in others:
+            offset = (int(other.rect.left), int(other.rect.top))
+            self.mask.erase(other.mask, offset)
+            self.columns.subtract(other.columns, offset)
+            # only the pixels inside the crater's rect are touched
+            other.mask.to_surface(
+                surface=self.surface,
+                setcolor=(0, 0, 0, 0),
+                unsetcolor=None,
+                dest=offset,
+            )
 
 
 class Interval:
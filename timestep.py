@@ -0,0 +1,52 @@
+from typing import Callable
+
+from config import MAX_FRAME_TIME
+from config import TICK_RATE
+
+
+Update = Callable[[float], None]
+
+
+class FixedTimestep:
+    """
+    Runs a simulation in fixed steps, whatever the real time between frames.
+    Time left over after the last whole step is kept for the next frame, and as a
+    fraction of a step it says how far to interpolate between the last two states
+    when rendering.
+    """
+
+    def __init__(
+        self, tick_rate: float = TICK_RATE, max_frame_time: float = MAX_FRAME_TIME
+    ) -> None:
+        self.dt = 1.0 / tick_rate
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.ticks = 0
+
+    @property
+    def interpolation(self) -> float:
+        return self.accumulator / self.dt
+
+    def advance(self, elapsed: float, update: Update) -> int:
+        """
+        Run as many steps as fit into the elapsed time, and return how many ran.
+        Long frames are clamped so a hitch cannot cause a spiral of catch-up steps.
+        """
+
+        self.accumulator += min(elapsed, self.max_frame_time)
+        steps = 0
+        while self.accumulator >= self.dt:
+            update(self.dt)
+            self.accumulator -= self.dt
+            self.ticks += 1
+            steps += 1
+        return steps
+
+    def run(self, duration: float, update: Update) -> None:
+        """
+        Run the steps for the specified duration as fast as possible
+        """
+
+        for _ in range(round(duration / self.dt)):
+            update(self.dt)
+            self.ticks += 1
@@ -14,6 +14,7 @@ class BaseTransition(EventSource):
         self.exit = Event()
 
     def render(self, surface: pygame.Surface) -> None:
+        self.to_screen.invalidate()
         self.to_screen.render(surface)
 
     def update(self, dt: float) -> None:
@@ -43,9 +44,11 @@ class Wipe(BaseTransition):
     def render(self, surface: pygame.Surface) -> None:
         if not self.from_surface:
             self.from_surface = surface.copy()
+            self.from_screen.invalidate()
             self.from_screen.render(self.from_surface)
         if not self.to_surface:
             self.to_surface = surface.copy()
+            self.to_screen.invalidate()
             self.to_screen.render(self.to_surface)
         surface.blit(
             self.from_surface,
@@ -78,6 +81,7 @@ class FadeToBlack(BaseTransition):
     def render(self, surface: pygame.Surface) -> None:
         if not self.from_surface:
             self.from_surface = surface.copy()
+            self.from_screen.invalidate()
             self.from_screen.render(self.from_surface)
 
         if not self.overlay:
@@ -7,6 +7,7 @@ from pygame import Rect
 from pygame import Surface
 from pygame.math import Vector2
 
+from assets import assets
 from config import HEIGHT
 from config import WIDTH
 from gradient import Gradient
@@ -41,9 +42,11 @@ class Scoreboard:
     def __iter__(self):
         return iter(self.scores)
 
-    def render(self, surface):
-        for healthbar in self.healthbars:
+    def render(self, surface) -> list[Rect]:
+        return [
             surface.blit(healthbar.surface, healthbar.rect.topleft)
+            for healthbar in self.healthbars
+        ]
 
     def add_score(self, index, value=1):
         self.scores[index] += value
@@ -58,15 +61,15 @@ class Scoreboard:
 class HotseatIndicator:
     def __init__(self):
         self.angle = 0
-        self.surface = pygame.image.load("images/hotseat.png").convert_alpha()
+        self.surface = assets.image("images/hotseat.png")
         self.pos = Vector2(0, 0)
 
     def update(self, dt):
         self.angle = (self.angle + 360 * dt) % 360
         self.pos.y += math.sin(math.radians(self.angle)) * 2
 
-    def render(self, surface):
-        surface.blit(self.surface, self.pos)
+    def render(self, surface) -> Rect:
+        return surface.blit(self.surface, self.pos)
 
 
 class WindGauge:
@@ -92,8 +95,8 @@ class WindGauge:
 
         self.wind.on_changed(self.redraw)
 
-    def render(self, surface) -> None:
-        surface.blit(self.surface, self.rect.topleft)
+    def render(self, surface) -> Rect:
+        return surface.blit(self.surface, self.rect.topleft)
 
     def redraw(self) -> None:
         try:
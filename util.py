@@ -1,3 +1,4 @@
+from typing import Iterable
 from typing import Optional
 
 from pygame import Rect
@@ -21,11 +22,29 @@ def identity_translation(coord: Vector) -> Vector:
 
 
 class Renderable:
-    def render(self, surface, translate: Optional[Translation] = None) -> None:
+    def render(self, surface, translate: Optional[Translation] = None) -> Rect:
         if translate is None:
             translate = identity_translation
 
-        surface.blit(self.surface, translate(self.rect.topleft))
+        return surface.blit(self.surface, translate(self.rect.topleft))
+
+
+def merge_rects(rects: Iterable[Rect]) -> list[Rect]:
+    """
+    Combine overlapping rects where their union is no bigger than the two of them
+    """
+
+    merged: list[Rect] = []
+    for rect in rects:
+        rect = Rect(rect)
+        for i in reversed(rect.collidelistall(merged)):
+            other = merged[i]
+            union = rect.union(other)
+            if union.w * union.h <= rect.w * rect.h + other.w * other.h:
+                rect = union
+                del merged[i]
+        merged.append(rect)
+    return merged
 
 
 def tile(surface: Surface, tile: Surface, area: Rect) -> None:
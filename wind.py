@@ -11,6 +11,7 @@ from event import Event
 from event import EventSource
 from particle import boundary
 from particle import Particle
+from particle import pool
 
 
 class Wind(EventSource):
@@ -57,11 +58,13 @@ def debris(wind: Wind, bounds: Rect) -> Iterable[Iterable[Particle]]:
     Particle factory for wind-blown debris
     """
 
+    forces = (wind, boundary(bounds))
+
     while True:
         if random.uniform(0, wind.max_speed) < wind.speed and random.random() >= 0.9:
-            p = Particle(
+            p = pool.acquire(
                 colour=Color(0, 0, 0),
-                forces=(wind, boundary(bounds)),
+                forces=forces,
             )
             p.pos.y = random.randint(0, bounds.height)
             if wind.direction < 0:
@@ -1,19 +1,34 @@
 import random
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from typing import Optional
 
 from pygame import Rect
 from pygame.math import Vector2
 
+from ai import ComputerPlayer
+from ai import Difficulty
+from broadphase import SpatialHash
+from compositor import Compositor
+from compositor import Layer
+from config import COMPUTER_DIFFICULTY
+from config import DAY_LENGTH
+from config import DAY_NIGHT_CYCLE
 from config import HEIGHT
 from config import WIDTH
 from explosion import Explosion
 from explosion import ExplosionEmitter
 from gorilla import Gorilla
 from particle import Emitter
+from sky import CloudPool
 from sky import clouds
 from sky import make_cloud_particle
 from sky import Sky
 from terrain import Building
 from terrain import Skyline
+from terrain import SkylineLayout
+from type_defs import Vector
 from ui import HotseatIndicator
 from ui import Scoreboard
 from ui import WindGauge
@@ -21,12 +36,26 @@ from wind import debris
 from wind import Wind
 
 
+class Round(NamedTuple):
+    skyline: SkylineLayout
+    gorillas: tuple[Vector, Vector]
+
+
 class World:
+    """
+    Everything in play: sky, skyline, gorillas, particles and the HUD.
+    Each is drawn as a layer of a compositor, with the sky and skyline cached.
+    The next round is generated and rendered on a worker thread while the current
+    one is played, so starting it only has to convert the prepared skyline.
+    """
+
     def __init__(self):
         self.angle: float = 0
         self.power: int = 0
         self.gravity = 9.8
         self.current_player = 0
+        self.computers: list[Optional[ComputerPlayer]] = [None, None]
+        self.interpolation = 1.0
         self.wind = Wind(max_speed=8)
         self.wind_gauge = WindGauge(
             (WIDTH / 2 - 80, HEIGHT - 16),
@@ -34,18 +63,27 @@ class World:
             self.wind,
         )
         self.gorillas = []
+        self.colliders = SpatialHash()
         self.skyline = Skyline()
+        # only used by the worker thread
+        self.round_random = random.Random()
+        self.round_builder = ThreadPoolExecutor(max_workers=1)
+        self.next_round: Optional[Future[Round]] = None
         self.scoreboard = Scoreboard()
         self.hotseat = HotseatIndicator()
-        self.sky = Sky(WIDTH, HEIGHT)
+        self.sky = Sky(WIDTH, HEIGHT, cycle=DAY_NIGHT_CYCLE, day_length=DAY_LENGTH)
+        # chosen a turn early, so the sky can be prepared in time
+        self.next_time = random.randint(0, 240)
+        self.sky.prefetch((self.next_time % 240) / 10)
         bounds = Rect(-150, 0, WIDTH + 300, HEIGHT)
         self.emitters = []
+        self.cloud_pool = CloudPool()
         cloud_emitter = Emitter(max_particles=7)
         cloud_emitter.add_stream(
-            clouds(self.wind, bounds),
+            clouds(self.wind, bounds, cloud_emitter, self.cloud_pool),
         )
         for _ in range(7):
-            cloud = make_cloud_particle(self.wind, bounds)
+            cloud = make_cloud_particle(self.wind, bounds, self.cloud_pool)
             cloud.pos.x = random.randrange(WIDTH)
             cloud.pos.y = random.randrange(60, int(bounds.height / 4))
             cloud_emitter.particles.append(cloud)
@@ -53,6 +91,17 @@ class World:
         wind_debris = Emitter()
         wind_debris.add_stream(debris(self.wind, bounds))
         self.emitters.append(wind_debris)
+        self.compositor = Compositor(
+            (WIDTH, HEIGHT),
+            (
+                Layer("sky", self.sky.render, cached=True),
+                Layer("terrain", self.skyline.render, cached=True),
+                Layer("particles", self.render_particles),
+                Layer("actors", self.render_actors),
+                Layer("hud", self.render_hud),
+            ),
+        )
+        self.sky.on_changed(self.sky_changed)
         self.reset()
 
     def reset(self):
@@ -61,64 +110,123 @@ class World:
         self.scoreboard.reset()
         self.rebuild()
 
-    def rebuild(self, *_):
-        self.skyline.generate_buildings()
-        self.gorillas = []
+    def prepare_round(self) -> Round:
+        """
+        Generate the skyline and gorilla placement of a round, on the worker thread
+        """
+
+        layout = Skyline.layout(self.round_random)
+        first, last = layout.buildings[0], layout.buildings[-1]
         offset_x = Building.MIN_WIDTH // 2
         offset_y = Gorilla.HEIGHT // 2 - 1
-        self.gorillas.append(
-            Gorilla(
-                (
-                    self.skyline.buildings[0].left + offset_x,
-                    self.skyline.buildings[0].top - offset_y,
-                )
-            )
-        )
-        self.gorillas.append(
-            Gorilla(
-                (
-                    self.skyline.buildings[-1].right - offset_x,
-                    self.skyline.buildings[-1].top - offset_y,
-                )
-            )
+        return Round(
+            layout,
+            (
+                (first.left + offset_x, first.top - offset_y),
+                (last.right - offset_x, last.top - offset_y),
+            ),
         )
+
+    def rebuild(self, *_):
+        if self.next_round is None:
+            self.next_round = self.round_builder.submit(self.prepare_round)
+        # only waits if the round was asked for before it could be prepared
+        prepared = self.next_round.result()
+        self.skyline.apply(prepared.skyline)
+        self.compositor.invalidate_layer("terrain")
+        self.gorillas = [Gorilla(pos) for pos in prepared.gorillas]
         self.hotseat.pos = Vector2(
             self.gorillas[0].rect.left, self.gorillas[0].rect.top - 128
         )
 
+        self.colliders.clear()
+        for building in self.skyline.buildings:
+            self.colliders.insert(self.skyline, building)
+        for gorilla in self.gorillas:
+            self.colliders.insert(gorilla)
+
+        self.next_round = self.round_builder.submit(self.prepare_round)
+
     def update(self, dt) -> None:
+        self.sky.update(dt)
         self.hotseat.update(dt)
         for emitter in self.emitters:
             emitter.update(dt)
 
-    def render(self, surface) -> None:
-        surface.blit(self.sky.surface, (0, 0))
-        self.skyline.render(surface)
+    def invalidate(self, rect: Optional[Rect] = None) -> None:
+        """
+        Mark a region of the surface last rendered to as needing a redraw, eg.
+        because something else was drawn over it, or all of it if no rect is given
+        """
+
+        self.compositor.invalidate(rect)
+
+    def render(self, surface) -> Optional[list[Rect]]:
+        """
+        Draw the world, redrawing only what changed if the surface still holds the
+        last frame.
+        Returns the changed rects, or None if the whole surface was redrawn.
+        """
+
+        return self.compositor.render(surface)
+
+    def render_particles(self, surface) -> list[Rect]:
+        drawn = []
         for emitter in self.emitters:
-            emitter.render(surface)
+            drawn += emitter.render(surface, interpolation=self.interpolation)
+        return drawn
 
-        for gorilla in self.gorillas:
-            gorilla.render(surface)
+    def render_actors(self, surface) -> list[Rect]:
+        return [gorilla.render(surface) for gorilla in self.gorillas]
 
-        self.scoreboard.render(surface)
-        self.wind_gauge.render(surface)
-        self.hotseat.render(surface)
+    def render_hud(self, surface) -> list[Rect]:
+        return [
+            *self.scoreboard.render(surface),
+            self.wind_gauge.render(surface),
+            self.hotseat.render(surface),
+        ]
 
     def set_angle_and_power(self, angle, power):
         self.angle = angle
         self.power = power
 
+    @property
+    def computer(self) -> Optional[ComputerPlayer]:
+        return self.computers[self.current_player]
+
+    def toggle_computer(self, player: int) -> None:
+        if self.computers[player]:
+            self.computers[player] = None
+        else:
+            self.computers[player] = ComputerPlayer(Difficulty[COMPUTER_DIFFICULTY])
+
     def change_wind(self, *_):
         self.wind.change()
 
+    def sky_changed(self) -> None:
+        self.compositor.invalidate_layer("sky")
+
     def set_time(self, *_, time=None):
         if time is None:
-            time = random.randint(0, 240)
+            if self.sky.cycle:
+                # the time of day moves on by itself
+                return
+            time = self.next_time
+            self.next_time = random.randint(0, 240)
+            self.sky.prefetch((self.next_time % 240) / 10)
         self.sky.time = (time % 240) / 10
 
-    def add_explosion(self, pos):
-        explosion = Explosion(pos)
+    def add_explosion(self, pos, speed: Optional[float] = None):
+        """
+        Blow a crater in the skyline, scaled by the impact speed if given
+        """
+
+        if speed is None:
+            explosion = Explosion(pos)
+        else:
+            explosion = Explosion.from_impact(pos, speed)
         self.skyline.destroy(explosion)
+        self.compositor.invalidate_layer("terrain", explosion.rect)
         emitter = ExplosionEmitter(pos=pos)
         emitter.on_done(self.remove_explosion)
         self.emitters.append(emitter)